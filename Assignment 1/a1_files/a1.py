@@ -1,5 +1,12 @@
+import shutil
+import sys
+
 from a1_support import *
 
+ESCAPE = '\x1b['
+ansi_display = False #Set by the --ansi command line option
+ansi_frame = None #(game, grid_size) last drawn by display_game_ansi
+
 #Game entity
 def game_initialization(grid_size, number_of_pokemon):
     """This function is run on game start to create an unexposed game string with a length of
@@ -15,11 +22,34 @@ def game_initialization(grid_size, number_of_pokemon):
     game = str(game_string_length * UNEXPOSED)
     return game
 
+display_templates = {} #grid_size -> (header line, separator line, row labels)
+
+def display_template(grid_size):
+    """Builds the parts of the game grid that only depend on the grid size.
+    These are cached so they are only built once per grid size.
+
+    Parameters:
+        grid_size (int): Size of game.
+    Returns:
+        (tuple<str, str, list<str>>): The column heading line, the separator line
+        and the start of each row (row heading and first wall).
+    """
+    if grid_size not in display_templates:
+        headings = []
+        for count in range(1, grid_size + 1):
+            headings.append(WALL_VERTICAL + ' ' + str(count) + (' ' if count < 10 else ''))
+        header = '  ' + ''.join(headings) + WALL_VERTICAL
+        separator = (len(header) + 1) * WALL_HORIZONTAL
+        row_starts = [ALPHA[row] + ' ' + WALL_VERTICAL + ' ' for row in range(grid_size)]
+        display_templates[grid_size] = (header, separator, row_starts)
+    return display_templates[grid_size]
+
 def display_game(game, grid_size):
     """Prints the game grid row-by-row. This is what the player will see.
 
-    This function is broken down into two parts, the first row (containing the column headings) and
-    all subsequent rows (containing the row heading followed by the grid cells).
+    The first row contains the column headings and all subsequent rows contain the
+    row heading followed by the grid cells, with a separator line between rows.
+    The whole grid is written to stdout at once.
     
     Parameters:
         game (str): Game string.
@@ -27,44 +57,82 @@ def display_game(game, grid_size):
     Returns:
         Prints the game as a grid.
     """
-    # Line 1 (grid_line1)
-    count = 1
-    grid_line1 = '  '
-    while count <= grid_size:
-        grid_line1 += WALL_VERTICAL
-        grid_line1 += ' '
-        grid_line1 += str(count)
-        if count < 10:
-            grid_line1 += ' '
-        count += 1
-    grid_line1 += WALL_VERTICAL
-    print(grid_line1)
-
-    # All other lines (grid_line)
-    count2 = 0
-    letter_count = 0
-    game_count = 0
-    while count2 <= (2 * grid_size):
-        grid_line = ''
-        if count2 % 2 == 0 or count2 == (2 * grid_size):
-            grid_line = (len(grid_line1) + 1) * WALL_HORIZONTAL
-        
-        else:
-            grid_line += ALPHA[letter_count]
-            grid_line += ' '
-            letter_count += 1
-            cell_count = 0
-            while cell_count < (grid_size):
-                grid_line += WALL_VERTICAL
-                grid_line += ' '
-                grid_line += game[game_count]
-                grid_line += ' '
-                cell_count += 1
-                game_count += 1
-            grid_line += WALL_VERTICAL
-        
-        print(grid_line)
-        count2 += 1
+    header, separator, row_starts = display_template(grid_size)
+    cell_wall = ' ' + WALL_VERTICAL + ' '
+    row_end = ' ' + WALL_VERTICAL
+
+    lines = [header, separator]
+    for row in range(grid_size):
+        cells = game[row * grid_size:(row + 1) * grid_size]
+        lines.append(row_starts[row] + cell_wall.join(cells) + row_end)
+        lines.append(separator)
+    lines.append('')
+    sys.stdout.write('\n'.join(lines))
+
+def display_game_ansi(game, grid_size):
+    """Draws the game grid using ANSI escape codes. The first call draws the
+    whole grid at the top of the terminal and keeps it there by limiting
+    scrolling to the lines below it. Later calls only move the cursor to the
+    cells that changed since the previous frame and rewrite those.
+
+    If the grid does not fit in the terminal the whole grid is printed
+    instead, as with display_game.
+
+    Parameters:
+        game (str): Game string.
+        grid_size (int): Size of game.
+    Returns:
+        Writes the changes to the grid.
+    """
+    global ansi_frame
+    grid_lines = 2 * grid_size + 2
+    terminal_lines = shutil.get_terminal_size().lines
+    if terminal_lines < grid_lines + 2:
+        ansi_frame = None
+        display_game(game, grid_size)
+        return
+
+    if ansi_frame is None or ansi_frame[1] != grid_size:
+        sys.stdout.write(ESCAPE + '2J' + ESCAPE + 'H')
+        display_game(game, grid_size)
+        sys.stdout.write(ESCAPE + str(grid_lines + 1) + ';' + str(terminal_lines) + 'r')
+        sys.stdout.write(ESCAPE + str(grid_lines + 1) + ';1H')
+    else:
+        previous = ansi_frame[0]
+        changes = ['\x1b7'] #Save the cursor position
+        for index in range(len(game)):
+            if game[index] != previous[index]:
+                row, column = divmod(index, grid_size)
+                line = 3 + 2 * row
+                offset = 5 + 4 * column
+                changes.append(ESCAPE + str(line) + ';' + str(offset) + 'H' + game[index])
+        changes.append('\x1b8') #Restore the cursor position
+        sys.stdout.write(''.join(changes))
+    sys.stdout.flush()
+    ansi_frame = (game, grid_size)
+
+def reset_ansi_display():
+    """Lets the whole terminal scroll again after display_game_ansi."""
+    global ansi_frame
+    if ansi_frame is not None:
+        sys.stdout.write(ESCAPE + 'r' + ESCAPE + '999;1H')
+        ansi_frame = None
+
+def show_game(game, grid_size):
+    """Shows the game grid in the main game loop. The grid is redrawn in place
+    with display_game_ansi when the --ansi option is used and the output is a
+    terminal, otherwise the whole grid is printed with display_game.
+
+    Parameters:
+        game (str): Game string.
+        grid_size (int): Size of game.
+    Returns:
+        Shows the game as a grid.
+    """
+    if ansi_display and sys.stdout.isatty():
+        display_game_ansi(game, grid_size)
+    else:
+        display_game(game, grid_size)
 
 def parse_position(alphanumeric, grid_size):
     """Converts the alphanumerical value of a cell in the game grid to a tuple.
@@ -299,6 +367,161 @@ def big_fun_search(game, grid_size, pokemon_locations, index):
  	return visible
 
 
+CURSES_HELP = "Arrows move  Space/Enter reveal  f flag  r restart  q quit"
+
+def draw_cell_curses(pad, game, grid_size, index, selected):
+    """Draws one cell of the game grid on the curses pad. The selected cell is
+    drawn highlighted.
+
+    Parameters:
+        pad (curses.window): Pad holding the game grid.
+        game (str): Game string.
+        grid_size (int): Size of game.
+        index (int): Game string index.
+        selected (bool): True if the cursor is on the cell.
+    """
+    import curses
+    row, column = divmod(index, grid_size)
+    attribute = curses.A_REVERSE if selected else curses.A_NORMAL
+    pad.addstr(2 + 2 * row, 4 + 4 * column, game[index], attribute)
+
+def curses_game(screen, grid_size, number_of_pokemon):
+    """Plays the game in a curses window. The grid is drawn once onto a pad and
+    after each action only the cells that changed are redrawn, with curses
+    refreshing only the parts of the terminal that differ. The pad scrolls to
+    keep the cursor visible when the grid is larger than the terminal.
+
+    The cursor is kept as a row and column and turned into an alphanumeric
+    position (e.g. 'B3') so it goes through the same parse_position and
+    position_to_index as typed actions.
+
+    Parameters:
+        screen (curses.window): The terminal window from curses.wrapper.
+        grid_size (int): Size of game.
+        number_of_pokemon (int): Total number of pokemon in the game.
+    """
+    import curses
+    curses.curs_set(0)
+    screen.keypad(True)
+
+    game = game_initialization(grid_size, number_of_pokemon)
+    pokemon_locations = generate_pokemons(grid_size, number_of_pokemon)
+    header, separator, row_starts = display_template(grid_size)
+    pad = curses.newpad(2 * grid_size + 2, len(separator) + 1)
+    pad.addstr(0, 0, header)
+    pad.addstr(1, 0, separator)
+    for row in range(grid_size):
+        cells = ' ' + WALL_VERTICAL + ' '
+        pad.addstr(2 + 2 * row, 0, row_starts[row] + cells.join(game[row * grid_size:(row + 1) * grid_size]) + ' ' + WALL_VERTICAL)
+        pad.addstr(3 + 2 * row, 0, separator)
+
+    row = column = 0
+    top = left = 0
+    message = CURSES_HELP
+    over = False
+    previous = game
+    draw_cell_curses(pad, game, grid_size, 0, True)
+    while True:
+        #Scroll the pad so the cursor is on screen
+        lines, columns = screen.getmaxyx()
+        view_lines = max(lines - 2, 1)
+        cursor_line = 2 + 2 * row
+        cursor_column = 4 + 4 * column
+        if cursor_line < top + 2:
+            top = max(cursor_line - 2, 0)
+        elif cursor_line >= top + view_lines:
+            top = cursor_line - view_lines + 1
+        if cursor_column < left + 4:
+            left = max(cursor_column - 4, 0)
+        elif cursor_column >= left + columns - 1:
+            left = cursor_column - columns + 2
+
+        screen.move(lines - 1, 0)
+        screen.clrtoeol()
+        screen.addstr(lines - 1, 0, message[:columns - 1])
+        screen.noutrefresh()
+        pad.noutrefresh(top, left, 0, 0, min(view_lines, 2 * grid_size + 2) - 1, columns - 1)
+        curses.doupdate()
+
+        key = screen.getch()
+        index = row * grid_size + column
+        if over:
+            break
+
+        if key in (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_LEFT, curses.KEY_RIGHT):
+            draw_cell_curses(pad, game, grid_size, index, False)
+            if key == curses.KEY_UP:
+                row = max(row - 1, 0)
+            elif key == curses.KEY_DOWN:
+                row = min(row + 1, grid_size - 1)
+            elif key == curses.KEY_LEFT:
+                column = max(column - 1, 0)
+            else:
+                column = min(column + 1, grid_size - 1)
+            draw_cell_curses(pad, game, grid_size, row * grid_size + column, True)
+            message = CURSES_HELP
+            continue
+
+        position = parse_position(ALPHA[row] + str(column + 1), grid_size)
+        index = position_to_index(position, grid_size)
+        message = CURSES_HELP
+        if key == ord('q'):
+            message = 'You sure about that buddy? (y/n)'
+            screen.addstr(lines - 1, 0, message[:columns - 1])
+            screen.clrtoeol()
+            if screen.getch() in (ord('y'), ord('Y')):
+                break
+            message = "Let's keep going."
+
+        elif key == ord('r'):
+            game = game_initialization(grid_size, number_of_pokemon)
+            pokemon_locations = generate_pokemons(grid_size, number_of_pokemon)
+            message = "It's rewind time."
+
+        elif key == ord('f'):
+            if game[index] in (UNEXPOSED, FLAG):
+                game = flag_cell(game, index)
+            else:
+                message = INVALID
+
+        elif key in (ord(' '), ord('\n'), curses.KEY_ENTER):
+            if game[index] == UNEXPOSED:
+                if index in pokemon_locations:
+                    for i in pokemon_locations:
+                        game = replace_character_at_index(game, i, POKEMON)
+                    message = 'You have scared away all the pokemons. Press any key.'
+                    over = True
+                else:
+                    character = number_at_cell(game, pokemon_locations, grid_size, index)
+                    game = replace_character_at_index(game, index, character)
+                    if character == 0:
+                        for i in big_fun_search(game, grid_size, pokemon_locations, index):
+                            if game[i] != FLAG:
+                                character = number_at_cell(game, pokemon_locations, grid_size, i)
+                                game = replace_character_at_index(game, i, character)
+
+        if not over and check_win(game, pokemon_locations):
+            message = 'You win. Press any key.'
+            over = True
+
+        #Redraw only the changed cells
+        for i in range(len(game)):
+            if game[i] != previous[i]:
+                draw_cell_curses(pad, game, grid_size, i, i == index)
+        draw_cell_curses(pad, game, grid_size, row * grid_size + column, True)
+        previous = game
+
+def play_curses():
+    """Asks for the grid size and number of pokemon as main does and then
+    plays the game with the curses interface.
+    """
+    import curses
+    import locale
+    locale.setlocale(locale.LC_ALL, '')
+    grid_size = int(input("Please input the size of the grid: "))
+    number_of_pokemon = int(input("Please input the number of pokemons: "))
+    curses.wrapper(curses_game, grid_size, number_of_pokemon)
+
 def main():
     """This is the main game code. At game start it asks for the inputs grid_size and number_of_pokemon
     to generate the pokemon_locations tuple. Then, while the check_win function does not return that the
@@ -315,7 +538,7 @@ def main():
     pokemon_locations = generate_pokemons(grid_size, number_of_pokemon)
     while check_win(game, pokemon_locations) == 0:
         restart = 0
-        display = display_game(game, grid_size)
+        show_game(game, grid_size)
         print()
         user_action = str(input('Please input action: '))
         if user_action == 'q':
@@ -355,7 +578,7 @@ def main():
                 if index in pokemon_locations:
                     for i in pokemon_locations:
                         game = replace_character_at_index(game, i, POKEMON)
-                    display_game(game, grid_size)
+                    show_game(game, grid_size)
                     print('You have scared away all the pokemons.')
                     loss = 1
                     break
@@ -375,10 +598,15 @@ def main():
         else:
             print(INVALID)
     if loss == 1:
-        pass
+        reset_ansi_display()
     else:
-        display_game(game, grid_size)
+        show_game(game, grid_size)
         print('You win.')
+        reset_ansi_display()
 if __name__ == "__main__":
-    main()
+    ansi_display = '--ansi' in sys.argv[1:]
+    if '--curses' in sys.argv[1:]:
+        play_curses()
+    else:
+        main()
 
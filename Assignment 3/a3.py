@@ -1,9 +1,23 @@
+import array
+import bisect
+import math
+import mmap
+import os
+import queue
 import random
+import re
+import struct
+import sys
+from collections import OrderedDict, deque
+import threading
+import time
 import tkinter as tk
-from tkinter import filedialog
-from tkinter.filedialog import asksaveasfilename, askopenfilename
-from PIL import Image, ImageTk
-import random
+import zlib
+
+#PIL is imported by load_pil when the first image is needed, so the game
+#model can be used without loading the image libraries
+Image = None
+ImageTk = None
 
 ###-PRESETS-###
 NUMBERS = "012345678"
@@ -20,8 +34,154 @@ UNEXPOSED = "~"
 
 TASK_ONE = 1
 TASK_TWO = 2
+
+IMAGE_DIR = "images"
+#Tile images in the order ImageBoardView indexes them
+TILE_IMAGES = ("pokeball.png", "unrevealed.png",
+               os.path.join("pokemon_sprites", "charizard.png"),
+               os.path.join("pokemon_sprites", "cyndaquil.png"),
+               os.path.join("pokemon_sprites", "pikachu.png"),
+               os.path.join("pokemon_sprites", "psyduck.png"),
+               os.path.join("pokemon_sprites", "togepi.png"),
+               os.path.join("pokemon_sprites", "umbreon.png"),
+               "zero_adjacent.png", "one_adjacent.png", "two_adjacent.png",
+               "three_adjacent.png", "four_adjacent.png", "five_adjacent.png",
+               "six_adjacent.png", "seven_adjacent.png", "eight_adjacent.png")
+POKEMON_SPRITES = 6 #Number of pokemon sprites in TILE_IMAGES, from index 2
+
+#Themes map each cell character to how it is drawn. Tile themes give a
+#TILE_IMAGES index for each of the POKEMON_SPRITES sprite numbers.
+COLOUR_THEME = {UNEXPOSED: ("dark green", ""), POKEMON: ("yellow", ""), FLAG: ("red", "")}
+COLOUR_THEME.update({number: ("light green", number) for number in NUMBERS})
+TILE_THEME = {FLAG: (0,)*POKEMON_SPRITES, UNEXPOSED: (1,)*POKEMON_SPRITES,
+              POKEMON: tuple(range(2, 2 + POKEMON_SPRITES))}
+TILE_THEME.update({number: (8 + int(number),)*POKEMON_SPRITES for number in NUMBERS})
+MIPMAP_SIZES = (8, 16, 32) #Below the ~60 pixel source tiles; larger cells are scaled from the sources
+TILE_CACHE_SIZES = 4 #Cell sizes whose tiles are kept, most recently used first
+ZOOM_LEVELS = (0.5, 0.75, 1, 1.5, 2, 3, 4)
+DEFAULT_ZOOM = 2 #Index of ZOOM_LEVELS, i.e. 1x
+THUMBNAIL_SIZE = 16 #Cell width in pixels of exported board images
+FRAME_TIME = 16 #Minimum milliseconds between coalesced redraws
+REVEAL_BATCH = 64 #Cells revealed between checks of the time budget
+REVEAL_BUDGET = 0.008 #Seconds of reveal work per event loop tick
+
+#Binary save files: header, the cells and pokemon locations encoded by the
+#snapshot codec, then a CRC32 of everything before it
+SAVE_MAGIC = b"PKSV"
+SAVE_VERSION = 2
+SAVE_PREFIX = struct.Struct("<4sB") #magic, version
+SAVE_HEADERS = {
+    1: struct.Struct("<4sBBIIII"), #magic, version, location format, grid size, pokemon, seed, time
+    2: struct.Struct("<4sBBBBIIIII"), #... cell format, compression, grid size, pokemon, seed, time, cell bytes
+    }
+SAVE_CHECKSUM = struct.Struct("<I")
+SAVE_EXTENSION = ".sav"
+CELL_CODES = NUMBERS + UNEXPOSED + FLAG + POKEMON #Cell character -> 4 bit code
+LOCATIONS_DELTAS = 0 #Locations stored as varint gaps between sorted indexes
+LOCATIONS_BITMAP = 1 #Locations stored as one bit per cell
+BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)) #Set bits of each byte
+CELLS_PACKED = 0 #Cells stored as 4 bits each
+CELLS_RLE = 1 #Cells stored as runs of the same state
+COMPRESS_NONE = 0
+COMPRESS_ZLIB = 1
+COMPRESS_LZMA = 2
+
+#Mapped save files keep one ASCII byte per cell at a fixed offset, so the
+#cells can be memory mapped and used as the game string of a BoardModel
+MAPPED_MAGIC = b"PKMM"
+MAPPED_VERSION = 1
+MAPPED_HEADER = struct.Struct("<4sBxxxIIII") #magic, version, grid size, pokemon, seed, time
+MAPPED_ALIGNMENT = 65536 #Offset of the cells; a multiple of every platform's mmap granularity
+MAPPED_EXTENSION = ".pkm"
+COUNT_CHUNK = 1 << 20 #Bytes of the game string copied at a time when counting cells
+
+#Autosave: every click is appended to a journal as a fixed-size record and
+#the whole game is checkpointed every CHECKPOINT_INTERVAL clicks
+ACTION_REVEAL = 1 #Left click
+ACTION_FLAG = 2 #Right click
+ACTION_EXPOSE = 3 #One cell uncovered without cascading, journalled for each cell a click uncovers
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".pokemon_autosave")
+JOURNAL_MAGIC = b"PKJL"
+JOURNAL_HEADER = struct.Struct("<4sI") #magic, checksum of the checkpoint it follows
+JOURNAL_RECORD = struct.Struct("<B3xII") #action, index, time
+JOURNAL_SYNC = 16 #Records written between fsyncs
+CHECKPOINT_INTERVAL = 256 #Records written between checkpoints
+
+#Replay files: header, the starting game in the binary save format, then
+#every flag and uncovered cell with the milliseconds since the start of the game
+REPLAY_MAGIC = b"PKRP"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sBxxxII") #magic, version, records, length of the starting game
+REPLAY_RECORD = struct.Struct("<B3xII") #action, index, milliseconds
+REPLAY_EXTENSION = ".rpl"
+REPLAY_CHECKPOINT = 64 #Moves between the games kept for seeking
+REPLAY_MAX_DELAY = 2000 #Longest pause in milliseconds when playing a replay
+
+#Save library: a directory of saves with an SQLite index of their details
+LIBRARY_DIR = os.path.join(os.path.expanduser("~"), "pokemon_saves")
+LIBRARY_INDEX = "library.sqlite3"
+LIBRARY_COLUMNS = ("name", "grid_size", "num_pokemon", "progress", "time", "modified")
+
+IO_CHUNK = 1 << 20 #Bytes read or written between progress reports
+WORKER_POLL = 50 #Milliseconds between checks for file worker results
+
+#Columnar game exports: a JSON index of little-endian typed arrays, one per
+#field, each aligned so NumPy can read it with fromfile or memmap
+COLUMNS_MAGIC = b"PKCOLUMN"
+COLUMNS_ALIGNMENT = 64
+GAME_COLUMNS = (("grid_size", "H"), ("num_pokemon", "I"), ("outcome", "B"), ("time", "I"),
+                ("clicks", "I"), ("revealed", "I"), ("flags", "I"), ("seed", "I"))
+OUTCOME_PLAYING = 0
+OUTCOME_WON = 1
+OUTCOME_LOST = 2
+
+#Probability estimates: components with more groups of cells than this are
+#sampled rather than enumerated, in independently seeded batches
+EXACT_GROUPS = 32
+SAMPLE_BATCHES = 8
+BATCH_SAMPLES = 4000
+CONFIDENCE_Z = 1.96 #95% confidence intervals
 ###-PRESETS-###
 
+def load_pil():
+    """Imports PIL's Image and ImageTk modules the first time they are needed."""
+    global Image, ImageTk
+    if Image is None:
+        from PIL import Image, ImageTk
+
+def build_render_table(theme):
+    """Turns a theme into a table indexed by the cell's byte in the game
+    string, so drawing a cell is a single lookup.
+
+    Parameters:
+        theme (dict<str, tuple>): cell character -> render primitive.
+
+    Returns:
+        (list<tuple>): the render primitive for each byte value (None for
+        characters the theme does not draw).
+    """
+    table = [None]*256
+    for instance, primitive in theme.items():
+        table[ord(instance)] = primitive
+    return table
+
+def resolve_render_table(table, tiles):
+    """Replaces the TILE_IMAGES indexes in a tile render table with the tile
+    images themselves.
+
+    Parameters:
+        table (list<tuple>): a table made by build_render_table from a tile theme.
+        tiles (list): the tile images, indexed as in TILE_IMAGES.
+
+    Returns:
+        (list<tuple>): the tile image for each byte value and sprite number.
+    """
+    return [None if entry is None else tuple(tiles[tile] for tile in entry)
+            for entry in table]
+
+COLOUR_TABLE = build_render_table(COLOUR_THEME)
+TILE_TABLE = build_render_table(TILE_THEME)
+
 class BoardModel(object):
     """The BoardModel class handles the backend game code.
     This class is responsible for editing, updating and checking
@@ -39,16 +199,127 @@ class BoardModel(object):
         super().__init__()
         self._grid_size = grid_size
         self._num_pokemon = num_pokemon
-        self._game = UNEXPOSED * (grid_size**2)
-        self._pokemon_locations = self.generate_pokemons(grid_size, num_pokemon)
+        self._game = bytearray(UNEXPOSED * (grid_size**2), "ascii")
+        self._counts = {} #Character -> cells holding it, counted on first use
+        self._storage_file = None
+        self._seed = random.getrandbits(32)
+        self.set_pokemon_locations(self.generate_pokemons(grid_size, num_pokemon))
 
     def get_game(self):
         """Retrieves the game string.
 
         Returns:
-            self._game (str): the game string.
+            (str): the game string.
+        """
+        return self._game[:].decode("ascii")
+
+    def set_game(self, game):
+        """Replaces the game string. A memory mapped game is overwritten in
+        place if the new game is the same size.
+
+        Parameters:
+            game (str): the new game string.
+        """
+        data = game.encode("ascii")
+        self._counts = {}
+        if isinstance(self._game, mmap.mmap) and len(data) == len(self._game):
+            self._game[:] = data
+        else:
+            self.close()
+            self._game = bytearray(data)
+            self._storage_file = None
+
+    def set_storage(self, storage, file_name=None):
+        """Makes the board use the given buffer as its game string, without
+        copying it. Used to play a memory mapped save file in place.
+
+        Parameters:
+            storage (bytearray|mmap.mmap): one ASCII byte per cell.
+            file_name (str): the file the buffer maps, or None.
+        """
+        self.close()
+        self._game = storage
+        self._grid_size = math.isqrt(len(storage))
+        self._counts = {}
+        self._storage_file = file_name
+
+    def get_storage_file(self):
+        """Retrieves the file the game string is mapped from.
+
+        Returns:
+            self._storage_file (str): the mapped save file, or None if the
+            game is held in memory.
+        """
+        return self._storage_file
+
+    def flush(self):
+        """Writes the changes to a memory mapped game back to its file."""
+        if isinstance(self._game, mmap.mmap) and not self._game.closed:
+            self._game.flush()
+
+    def get_cells(self):
+        """Retrieves a live, read only view of the game string that reads
+        cells as they are used, for views that only draw part of the board.
+
+        Returns:
+            (GameCells): the view.
+        """
+        return GameCells(self)
+
+    def close(self):
+        """Writes a memory mapped game back to its file and unmaps it. Other
+        games are left alone.
+        """
+        if isinstance(self._game, mmap.mmap) and not self._game.closed:
+            self.flush()
+            self._game.close()
+
+    def snapshot(self):
+        """Copies the game so it can be saved while this one keeps changing.
+
+        Returns:
+            (BoardModel): a copy held in memory, even if this game is memory mapped.
+        """
+        board_model = BoardModel(0, 0)
+        board_model.set_storage(bytearray(self._game))
+        #The locations and sprites are never changed in place, so they are shared
+        board_model._seed = self._seed
+        board_model._num_pokemon = self._num_pokemon
+        board_model._pokemon_locations = self._pokemon_locations
+        board_model._pokemon_set = self._pokemon_set
+        board_model._sprites = self._sprites
+        board_model._counts = dict(self._counts)
+        return board_model
+
+    def count_cells(self, character):
+        """Counts the cells holding a character. The game string is only
+        scanned the first time, a chunk at a time so a memory mapped game is
+        never copied whole; after that the count is kept up to date as cells
+        change.
+
+        Parameters:
+            character (str): the cell character.
+
+        Returns:
+            (int): the number of cells.
         """
-        return self._game
+        if character not in self._counts:
+            value = ord(character)
+            self._counts[character] = sum(self._game[start:start + COUNT_CHUNK].count(value)
+                                          for start in range(0, len(self._game), COUNT_CHUNK))
+        return self._counts[character]
+
+    def get_cell(self, index):
+        """Retrieves a single character of the game string without building
+        the whole string.
+
+        Parameters:
+            index (int): Game string index.
+
+        Returns:
+            (str): the character at the index.
+        """
+        return chr(self._game[index])
 
     def get_grid_size(self):
         """Retrieves the grid size.
@@ -75,6 +346,58 @@ class BoardModel(object):
         """
         return self._pokemon_locations
 
+    def set_pokemon_locations(self, pokemon_locations):
+        """Replaces the pokemon locations.
+
+        Parameters:
+            pokemon_locations (tuple<int>): the indexes of the pokemon.
+        """
+        self._pokemon_locations = tuple(pokemon_locations)
+        self._num_pokemon = len(self._pokemon_locations)
+        self._pokemon_set = frozenset(self._pokemon_locations)
+        self._sprites = {index: self.sprite_hash(index) for index in self._pokemon_locations}
+
+    def get_seed(self):
+        """Retrieves the seed used to choose the pokemon sprites.
+
+        Returns:
+            self._seed (int): the board seed.
+        """
+        return self._seed
+
+    def set_seed(self, seed):
+        """Replaces the board seed and reassigns the pokemon sprites.
+
+        Parameters:
+            seed (int): the new board seed.
+        """
+        self._seed = seed
+        self.set_pokemon_locations(self._pokemon_locations)
+
+    def sprite_hash(self, index):
+        """Hashes a cell index with the board seed to pick a pokemon sprite, so
+        the same board always shows the same pokemon in the same cell.
+
+        Parameters:
+            index (int): Game string index.
+
+        Returns:
+            (int): the sprite number, from 0 to POKEMON_SPRITES - 1.
+        """
+        value = (index*0x9E3779B1 + self._seed) & 0xFFFFFFFF
+        value ^= value >> 16
+        value = (value*0x85EBCA6B) & 0xFFFFFFFF
+        value ^= value >> 13
+        return value % POKEMON_SPRITES
+
+    def get_sprites(self):
+        """Retrieves the sprite assigned to each pokemon location.
+
+        Returns:
+            self._sprites (dict<int, int>): pokemon index -> sprite number.
+        """
+        return self._sprites
+
     def generate_pokemons(self, grid_size, number_of_pokemons):
         """Pokemons will be generated and given a random index within the game.
 
@@ -109,9 +432,8 @@ class BoardModel(object):
             (bool): returns True if the game is lost.
         """
         self.loss = 0
-        for value in self._game:
-            if value == POKEMON:
-                return 1
+        if self.count_cells(POKEMON):
+            return 1
 
     def check_win(self):
         """This function, when called, checks if the current state of the game
@@ -122,17 +444,17 @@ class BoardModel(object):
             (bool): returns True if the game is won.
         """
         self.win = 0
-        index = -1
+        flag_count = self.count_cells(FLAG) #No. flags in game string
+        if flag_count != self._num_pokemon or self.count_cells(UNEXPOSED):
+            return None
+
+        flag = ord(FLAG)
         pokemon_caught = 0
-        flag_count = 0 #No. flags in game string
-        for value in self._game: #Iterates over all values in game string
-            index += 1
-            if value == FLAG: #Checks if the value at the specified index is flagged
-                flag_count += 1
-                if index in self._pokemon_locations: #Checks if the flag at the index is a valid pokemon location
-                    pokemon_caught += 1
+        for index in self._pokemon_locations: #Checks if each pokemon location is flagged
+            if self._game[index] == flag:
+                pokemon_caught += 1
 
-        if pokemon_caught == self._num_pokemon and flag_count == self._num_pokemon and UNEXPOSED not in self._game:
+        if pokemon_caught == self._num_pokemon:
             return 1
 
 
@@ -160,14 +482,13 @@ class BoardModel(object):
         Returns:
             (str): Updated game string.
         """
-        game_string = list(self._game)
-        game_string[index] = character
-        new_game = ""
-        
-        for i in game_string:
-            new_game += str(i)
-            
-        self._game = new_game
+        old = chr(self._game[index])
+        character = str(character)
+        self._game[index] = ord(character)
+        if old in self._counts:
+            self._counts[old] -= 1
+        if character in self._counts:
+            self._counts[character] += 1
 
     def index_in_direction(self, index, direction): #Returns the index of the cell from the direction of the given index
         """Returns the index in the game string of the cell in the specified
@@ -235,7 +556,7 @@ class BoardModel(object):
         """
         number_at_cell = 0
         for i in self.neighbour_directions(index):
-            if i in self._pokemon_locations:
+            if i in self._pokemon_set:
                 number_at_cell += 1
         return number_at_cell
         
@@ -262,11 +583,9 @@ class BoardModel(object):
         Returns:
             (list<int>): List of cells to turn visible.
             """
-        game = self._game
-        grid_size = self._grid_size
-        pokemon_locations = self._pokemon_locations
+        game = self.get_game()
         queue = [index]
-        discovered = [index]
+        discovered = {index}
             
         visible = []
         if game[index] == FLAG:
@@ -282,7 +601,7 @@ class BoardModel(object):
                         if neighbour in discovered or neighbour is None:
                                 continue
 
-                        discovered.append(neighbour)
+                        discovered.add(neighbour)
                         if game[neighbour] != FLAG:
                                 number = self.number_at_index(neighbour)
                                 if number == 0:
@@ -290,281 +609,2229 @@ class BoardModel(object):
                         visible.append(neighbour)
         return visible
 
-class PokemonGame(object):
-    """This is the controller class for the pokemon game. This class is responsible
-    for the interaction between the visible interface and the back end game state.
-    """
-    def __init__(self, master, grid_size=10, num_pokemon=15, task=TASK_TWO):
-        """Constructs a game for the given grid size, number of pokemon and task in
-        the specified master window.
+    def reveal_cells(self, index):
+        """Reveals the cell at the specified index. If the cell has no
+        neighbouring pokemon the reveal cascades through the connected zero
+        cells in breadth first order, revealing the same cells as
+        big_fun_search. Flagged cells are left alone.
+
+        This is a generator so that a big cascade can be applied a batch at a
+        time between event loop ticks. Each batch is written to the game string
+        before it is yielded.
 
         Parameters:
-            master (str): the window in which to display the game (typically, root).
-            grid_size (int): the size of the game.
-            num_pokemon (int): the number of hidden pokemon.
-            task (str): the specified task number.
+            index (int): Index of the currently selected cell.
+        Yields:
+            (list<int>): the indexes of the cells revealed in the batch.
         """
-        super().__init__()
-        self._master = master
-        self._grid_size = grid_size
-        self._num_pokemon = num_pokemon
-        self._task = task
-
-        #Window Configuration
-        self._master.title("Pokemon: Got2 Find Them All!")
+        unexposed = ord(UNEXPOSED)
+        if self._game[index] != unexposed:
+            return
 
-        self._title = tk.Label(master, text = "Pokemon: Got 2 Find Them All!", bg="#d46e69", fg="white")
-        self._title.config(font=("Comic Sans MS", 16, "bold"))
-        self._title.pack(side = tk.TOP, anchor=tk.N, fill=tk.X)
+        number = self.number_at_index(index)
+        self.replace_character_at_index(number, index)
+        batch = [index]
 
-        #Game Initialisation
-        self.board_model = BoardModel(grid_size, num_pokemon)
-        
-        if task == 1:
-            self.board_view = BoardView(master, grid_size)
-            self.board_view.draw_board(self.board_model.get_game())
-        
-        elif task == 2:
-            self.board_view = ImageBoardView(master, grid_size)
-            self.board_view.draw_board(self.board_model.get_game())
-            self.status_bar = StatusBar(master, num_pokemon, self.board_model.get_game())
-            self.status_bar.pack(side=tk.TOP, anchor=tk.N)
-            FileMenu(master)
-            
-        #Bindings
-        self.board_view.bind('<Button-3>', self.right_click)
-        self.board_view.bind('<Button-2>', self.right_click)
-        self.board_view.bind("<Button-1>", self.left_click)
-        
+        queue = deque()
+        discovered = {index}
+        if number == 0:
+            queue.append(index)
 
-    def check_game_state(self):
-        """This function is called on every left or right click to check the game
-        state and if a win or loss has occurred, create the necessary end of game
-        popup window.
-        """
-        self._game_state = ""
-        win = self.board_model.check_win()
-        loss = self.board_model.check_loss()
-        
-        if win == 1:
-            self._game_state = "You won!"
+        while queue:
+            node = queue.popleft()
+            for neighbour in self.neighbour_directions(node):
+                if neighbour in discovered:
+                    continue
+
+                discovered.add(neighbour)
+                if self._game[neighbour] != unexposed:
+                    continue
+
+                number = self.number_at_index(neighbour)
+                self.replace_character_at_index(number, neighbour)
+                batch.append(neighbour)
+                if number == 0:
+                    queue.append(neighbour)
 
-        elif loss == 1:
-            self._game_state = "You lose."
-        
-        if self._game_state != "":
-            self.end = tk.Tk()
-            self.end.title("Game over")
-            self.end.geometry("400x125")
-            label1 = tk.Label(self.end, text=f"{self._game_state}", pady=5)
-            label1.config(font=12)
-            label1.pack()
+            if len(batch) >= REVEAL_BATCH:
+                yield batch
+                batch = []
 
-            label2 = tk.Label(self.end, text="Would you like to play again?", pady=10)
-            label2.config(font=10)
-            label2.pack()
+        if batch:
+            yield batch
 
-            button1 = tk.Button(self.end, text="Yes", command=self.restart)
-            button1.pack(side=tk.LEFT, anchor=tk.N, ipadx=20, pady=10, expand=1)
+    def catch_pokemon(self):
+        """Reveals every pokemon, as happens when one is clicked.
 
-            button1 = tk.Button(self.end, text="No", command=self.exit)
-            button1.pack(side=tk.LEFT, anchor=tk.N, ipadx=20, pady=10, expand=1)            
+        Returns:
+            (tuple<int>): the indexes of the revealed cells.
+        """
+        for instance in self._pokemon_locations:
+            self.replace_character_at_index(POKEMON, instance)
+        return self._pokemon_locations
 
-    def left_click(self, e):
-        """This function handles the left click event. When called, this function
-        updates the game board with the new game string and calls for the GUI to
-        be updated.
+    def expose_cell(self, index):
+        """Uncovers a single unexposed cell without cascading.
 
         Parameters:
-            e (tuple): the coordinates of the mouse when pressed.
+            index (int): Game string index.
+
+        Returns:
+            (bool): True if the cell changed.
         """
-        game = self.board_model.get_game()
-        position = self.board_view.pixel_to_position((e.x, e.y))
-        index = round(position[0]*self._grid_size + position[1])
+        if self.get_cell(index) != UNEXPOSED:
+            return False
+        if index in self._pokemon_set:
+            self.replace_character_at_index(POKEMON, index)
+        else:
+            self.replace_character_at_index(self.number_at_index(index), index)
+        return True
+
+    def toggle_flag(self, index):
+        """Flags an unexposed cell, if there are flags left, or unflags a
+        flagged cell.
 
-        if game[index] == UNEXPOSED: #If tall grass
-            if index in self.board_model.get_pokemon_locations(): #If pokemon
-                for instance in self.board_model.get_pokemon_locations():
-                    self.board_model.replace_character_at_index(POKEMON, instance)
+        Parameters:
+            index (int): Game string index.
 
-            else:
-                number = self.board_model.number_at_index(index)
-                self.board_model.replace_character_at_index(number, index)
-                
-                if number == 0:
-                    visible = self.board_model.big_fun_search(index)
-                    
-                    for instance in visible:
-                        number = self.board_model.number_at_index(instance)
-                        self.board_model.replace_character_at_index(number, instance)
-        
-        self.board_view.draw_board(self.board_model.get_game())
-        self.check_game_state()
+        Returns:
+            (bool): True if the cell changed.
+        """
+        cell = self.get_cell(index)
+        if cell == UNEXPOSED and self.count_cells(FLAG) < self._num_pokemon:
+            self.replace_character_at_index(FLAG, index)
+        elif cell == FLAG:
+            self.replace_character_at_index(UNEXPOSED, index)
+        else:
+            return False
+        return True
+
+    def apply_action(self, action, index):
+        """Applies a click to the game in one go, including the whole of any
+        reveal cascade.
 
-    def right_click(self, e):
-        """This function handles the right click event. When called, this function
-        updates the game board with the new game string and calls for the GUI to
-        be updated.
+        Parameters:
+            action (int): ACTION_REVEAL, ACTION_FLAG or ACTION_EXPOSE.
+            index (int): Game string index.
+
+        Returns:
+            (list<int>): the indexes of the changed cells.
+        """
+        if action == ACTION_FLAG:
+            return [index] if self.toggle_flag(index) else []
+        if action == ACTION_EXPOSE:
+            return [index] if self.expose_cell(index) else []
+
+        if self.get_cell(index) != UNEXPOSED:
+            return []
+        if index in self._pokemon_set:
+            return list(self.catch_pokemon())
+
+        changed = []
+        for batch in self.reveal_cells(index):
+            changed += batch
+        return changed
+
+class GameCells(object):
+    """A read only view of a board's game string that reads each cell from
+    the board as it is used, so drawing the visible part of a large memory
+    mapped game never copies the whole of it. It supports the parts of the
+    string interface the views use: indexing, len and count.
+    """
+    def __init__(self, board_model):
+        """Constructs a view of the given board.
 
         Parameters:
-            e (tuple): the coordinates of the mouse when pressed.
+            board_model (BoardModel): the board to view.
         """
-        position = self.board_view.pixel_to_position((e.x, e.y))
-        index = round(position[0]*self._grid_size + position[1])
-        flag_count = 0
+        self._board_model = board_model
 
-        for instance in self.board_model.get_game():
-            if instance == FLAG:
-                flag_count += 1
+    def __getitem__(self, index):
+        """Retrieves a cell.
 
-        if self.board_model.get_game()[index] == UNEXPOSED and flag_count < self._num_pokemon:
-            self.board_model.replace_character_at_index(FLAG, index)
-            
-        elif self.board_model.get_game()[index] == FLAG:
-            self.board_model.replace_character_at_index(UNEXPOSED, index)
-            
-        self.board_view.draw_board(self.board_model.get_game())
-        self.check_game_state()
-        
-        if self._task == 2:
-            self.status_bar.update_num_catches(self.board_model.get_game())
+        Parameters:
+            index (int): Game string index.
 
-    def restart(self):
-        """This function handles the restarting of the game by closing all windows and
-        calling the main() function.
+        Returns:
+            (str): the character at the index.
         """
-        self.end.destroy()
-        root.destroy()
-        main()
+        return self._board_model.get_cell(index)
 
-    def exit(self):
-        """This function handles the exiting of the game by closing all windows.
+    def __len__(self):
+        """Retrieves the number of cells.
+
+        Returns:
+            (int): the number of cells.
         """
-        exit()
+        return self._board_model.get_grid_size()**2
 
-class BoardView(tk.Canvas):
-    """This is the class that controls the GUI when task=TASK_ONE. This class is
-    responsible for updating the GUI and calculating the bounding box, center
-    pixel and the position of tiles. This class inherits from tk.Canvas.
+    def count(self, character):
+        """Counts the cells holding a character.
+
+        Parameters:
+            character (str): the cell character.
+
+        Returns:
+            (int): the number of cells.
+        """
+        return self._board_model.count_cells(character)
+
+class ConstraintSolver(object):
+    """Deduces which tall grass cells are certainly safe and which certainly
+    hide a pokemon, using only the numbers a player can see. A number
+    constrains its unknown neighbours; when the constraint is settled by
+    itself, or by comparing it with a neighbouring constraint whose
+    unknown cells contain its own, the cells are deduced.
+
+    The board is scanned once. After that, update is told which cells a
+    click changed and only the constraints touching them are re-evaluated,
+    through a queue of dirty number cells.
     """
-    def __init__(self, master, grid_size, board_width=600, *args, **kwargs):
-        """Constructs a board view using the given grid size, board width,
-        args and kwargs for the master window.
+    def __init__(self, board_model):
+        """Constructs a solver for the given game.
 
         Parameters:
-            master (str): the window in which to display the game (typically, root).
-            grid_size (int): the size of the game.
-            board_width (int): the board width.
+            board_model (BoardModel): the game to solve.
         """
-        super().__init__(master, width=board_width, height=board_width, borderwidth=0, highlightthickness=0, *args, **kwargs)
-        self._master = master
-        self._grid_size = grid_size
-        self._board_width = board_width
+        self._board_model = board_model
+        self._neighbours = {} #Index -> neighbour indexes, filled as needed
+        self._safe = set() #Deduced safe cells not yet revealed
+        self._pokemon = set() #Deduced pokemon
+        self._dirty = deque() #Number cells whose constraint may have changed
+        self._queued = set()
+        self.update(range(board_model.get_grid_size()**2))
 
-    def draw_board(self, board):
-        """This function refreshes the board view and draws the game using the
-        specified board (game string).
+    def get_board_model(self):
+        """Retrieves the game being solved.
 
-        Parameters:
-            board (str): the game string.
+        Returns:
+            self._board_model (BoardModel): the game.
         """
-        self.delete("all")
-        width = self._board_width
-        grid_size = self._grid_size
-        game = board
-        
-        row_count = -1
-        game_count = 0
-        index = 0
-        
-        while row_count < grid_size - 1:
-            col_count = 0
-            row_count += 1
-            
-            while col_count < grid_size:
-                    instance = game[index]
-                    index += 1
-                    game_count += 1
+        return self._board_model
 
-                    x1 = col_count*(width/grid_size)
-                    x2 = (col_count+1)*(width/grid_size)
-                    y1 = row_count*(width/grid_size)
-                    y2 = (row_count+1)*(width/grid_size)
+    def neighbours(self, index):
+        """Retrieves the neighbours of a cell, remembering them for next time.
 
-                    if instance == UNEXPOSED:
-                        colour = "dark green"
+        Parameters:
+            index (int): Game string index.
 
-                    elif instance == POKEMON:
-                        colour = "yellow" 
+        Returns:
+            (list<int>): the neighbouring indexes.
+        """
+        if index not in self._neighbours:
+            self._neighbours[index] = self._board_model.neighbour_directions(index)
+        return self._neighbours[index]
 
-                    elif instance == FLAG:
-                        colour = "red"
+    def update(self, changed):
+        """Queues the constraints affected by changed cells.
 
-                    elif instance in NUMBERS:
-                        colour = "light green"
+        Parameters:
+            changed (iterable<int>): the indexes of the changed cells.
+        """
+        for index in changed:
+            cell = self._board_model.get_cell(index)
+            if cell in NUMBERS:
+                self._safe.discard(index)
+                self.enqueue(index)
+            elif cell == POKEMON:
+                self._pokemon.add(index)
+            else:
+                continue
+            for neighbour in self.neighbours(index):
+                self.enqueue(neighbour)
 
-                    self.create_rectangle(x1, y1, x2, y2, fill=colour)
-                    col_count += 1
+    def enqueue(self, index):
+        """Queues a revealed number cell to have its constraint evaluated.
 
-                    if instance in NUMBERS:
-                        self.create_text(x2-(width/grid_size)/2, y1+(width/grid_size)/2, text=instance)
-        self.pack(side=tk.TOP, anchor=tk.N)
+        Parameters:
+            index (int): Game string index.
+        """
+        if index not in self._queued and self._board_model.get_cell(index) in NUMBERS:
+            self._queued.add(index)
+            self._dirty.append(index)
 
-    def get_bbox(self, pixel):
-        """This function calculates the bounding box of tile at the specified
-        pixel coordinates. 
+    def constraint(self, index):
+        """Works out the constraint of a revealed number.
 
         Parameters:
-            pixel (tuple): a tuple containing the pixel coordinates.
+            index (int): Game string index of the number.
 
         Returns:
-            (x1, y1, x2, y2) (tuple): a tuple containing the bounding box.
+            (tuple): the neighbours not yet known to be safe or pokemon
+            (frozenset<int>) and how many pokemon are among them (int).
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        x, y = pixel
-        x1 = (x//(width/grid_size))*(width/grid_size)
-        x2 = x1+(width/grid_size)
-        y1 = (y//(width/grid_size))*(width/grid_size)
-        y2 = y1+(width/grid_size)
-        return (x1, y1, x2, y2)
-
-    def position_to_pixel(self, position):
-        """This function calculates the center pixel of the tile at the
-        given position.
+        unknown = []
+        pokemon = int(self._board_model.get_cell(index))
+        for neighbour in self.neighbours(index):
+            if neighbour in self._pokemon:
+                pokemon -= 1
+            elif neighbour not in self._safe and self._board_model.get_cell(neighbour) not in NUMBERS:
+                unknown.append(neighbour)
+        return frozenset(unknown), pokemon
+
+    def deduce(self, cells, pokemon):
+        """Records cells as deduced and queues the constraints they touch.
 
         Parameters:
-            position (tuple): a tuple containing the position of the tile (row, column).
+            cells (iterable<int>): the deduced cells.
+            pokemon (bool): True if they are pokemon, False if they are safe.
+        """
+        for index in cells:
+            (self._pokemon if pokemon else self._safe).add(index)
+            for neighbour in self.neighbours(index):
+                self.enqueue(neighbour)
+
+    def solve(self):
+        """Evaluates the queued constraints until no more can be deduced."""
+        while self._dirty:
+            index = self._dirty.popleft()
+            self._queued.discard(index)
+            unknown, pokemon = self.constraint(index)
+            if not unknown:
+                continue
+            if pokemon == 0:
+                self.deduce(unknown, False)
+                continue
+            if pokemon == len(unknown):
+                self.deduce(unknown, True)
+                continue
+
+            #Compare with the numbers that share an unknown cell
+            others = {other for cell in unknown for other in self.neighbours(cell)}
+            others.discard(index)
+            for other in others:
+                if self._board_model.get_cell(other) not in NUMBERS:
+                    continue
+                other_unknown, other_pokemon = self.constraint(other)
+                if unknown < other_unknown:
+                    rest, rest_pokemon = other_unknown - unknown, other_pokemon - pokemon
+                elif other_unknown < unknown:
+                    rest, rest_pokemon = unknown - other_unknown, pokemon - other_pokemon
+                else:
+                    continue
+                if rest_pokemon == 0:
+                    self.deduce(rest, False)
+                elif rest_pokemon == len(rest):
+                    self.deduce(rest, True)
+
+    def get_safe(self):
+        """Retrieves the cells deduced to be safe that are still covered.
 
         Returns:
-            (x, y) (tuple): the center pixel of the specified tile.
+            (set<int>): the safe cells.
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        row, col = position
-        x = (col*(width/grid_size))+(width/grid_size)/2
-        y = (row*(width/grid_size))+(width/grid_size)/2
-        return (x, y)
+        self.solve()
+        return self._safe
 
-    def pixel_to_position(self, pixel):
-        """This function calculates the position of the tile at the given
-        pixel coordinates.
+    def get_pokemon(self):
+        """Retrieves the cells deduced to hide a pokemon.
+
+        Returns:
+            (set<int>): the pokemon cells.
+        """
+        self.solve()
+        return self._pokemon
+
+    def hint(self):
+        """Picks a tall grass cell that is certainly safe to reveal. Flagged
+        cells can be deduced safe too, but clicking them does nothing, so
+        they are never picked.
+
+        Returns:
+            (int): a safe cell's index, or None if none can be deduced.
+        """
+        board_model = self._board_model
+        return min((index for index in self.get_safe() if board_model.get_cell(index) == UNEXPOSED),
+                   default=None)
+
+    def play(self, limit=None):
+        """Plays the game as a bot by revealing deduced safe cells until none
+        are left.
 
         Parameters:
-            pixel (tuple): a tuple containing the pixel coordinates.
+            limit (int): the most cells to reveal, or None for no limit.
 
         Returns:
-            position (tuple): a tuple containing the position (row, column).
+            (int): the number of cells revealed.
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        x, y = pixel
-        position = (y//(width/grid_size)), (x//(width/grid_size))
-        return position
+        clicks = 0
+        while limit is None or clicks < limit:
+            index = self.hint()
+            if index is None:
+                break
+            self.update(self._board_model.apply_action(ACTION_REVEAL, index))
+            clicks += 1
+        return clicks
 
+def convolve(first, second):
+    """Convolves two distributions of pokemon counts.
 
-class StatusBar(tk.Frame):
-    """This class is responsible for updating, modifying and drawing the status bar
+    Parameters:
+        first (list<int>): the weight of each count in the first.
+        second (list<int>): the weight of each count in the second.
+
+    Returns:
+        (list<int>): the weight of each total count.
+    """
+    total = [0]*(len(first) + len(second) - 1)
+    for i, a in enumerate(first):
+        if a:
+            for j, b in enumerate(second):
+                total[i + j] += a*b
+    return total
+
+def sample_component(job):
+    """Estimates the placements in a component by sequential importance
+    sampling. Each sample walks the groups in order and picks a pokemon count
+    for each group uniformly from the counts its numbers still allow, so every
+    completed layout is consistent; a sample that reaches a group with no
+    allowed count is dropped. Weighting each layout by the inverse of its
+    chance of being drawn makes the sums unbiased estimates of the exact
+    enumeration, scaled by the number of samples.
+
+    Run in a worker process, so it takes and returns only plain values.
+
+    Parameters:
+        job (tuple): the group sizes and the numbers each group touches
+            (list<tuple<int, tuple<int>>>), the pokemon each number needs
+            (list<int>), the seed for the batch (str) and the number of
+            samples (int).
+
+    Returns:
+        (tuple): the weight of each pokemon count (list<int>) and for each
+        group the pokemon it holds weighted the same way (list<list<int>>).
+    """
+    groups, need, seed, samples = job
+    rng = random.Random(seed)
+    cells = [0]*len(need)
+    for size, numbers in groups:
+        for number in numbers:
+            cells[number] += size
+    total_size = sum(size for size, _ in groups)
+    weights = [0]*(total_size + 1)
+    group_pokemon = [[0]*(total_size + 1) for _ in groups]
+    chosen = [0]*len(groups)
+
+    for _ in range(samples):
+        left, remaining = list(need), list(cells)
+        ways, total = 1, 0
+        for group, (size, numbers) in enumerate(groups):
+            for number in numbers:
+                remaining[number] -= size
+            low = max(0, max(left[number] - remaining[number] for number in numbers))
+            high = min(size, min(left[number] for number in numbers))
+            if low > high:
+                ways = 0
+                break
+            pokemon = rng.randint(low, high)
+            ways *= math.comb(size, pokemon)*(high - low + 1)
+            for number in numbers:
+                left[number] -= pokemon
+            chosen[group] = pokemon
+            total += pokemon
+        if ways:
+            weights[total] += ways
+            for group, pokemon in enumerate(chosen):
+                if pokemon:
+                    group_pokemon[group][total] += ways*pokemon
+    return weights, group_pokemon
+
+class MonteCarloEstimator(object):
+    """Samples components too large to enumerate, spreading independently
+    seeded batches over a pool of worker processes.
+    """
+    def __init__(self, batches=SAMPLE_BATCHES, samples=BATCH_SAMPLES, workers=None, seed=0):
+        """Constructs an estimator. The pool is only started when needed.
+
+        Parameters:
+            batches (int): the number of batches, which sets the resolution
+                of the confidence intervals.
+            samples (int): the samples in each batch.
+            workers (int): the worker processes to use, None for one per
+                core or 0 to sample in this process.
+            seed (int): the seed the batch seeds are derived from.
+        """
+        self._batches = batches
+        self._samples = samples
+        self._workers = workers
+        self._seed = seed
+        self._pool = None
+
+    def get_pool(self):
+        """Starts the worker pool the first time it is needed. The workers
+        are spawned rather than forked, as forking a process that already
+        runs threads, such as the file worker, can copy a lock another
+        thread holds into the child.
+
+        Returns:
+            (ProcessPoolExecutor): the pool, or None to sample in process.
+        """
+        if self._pool is None and self._workers != 0:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self._workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def estimate(self, groups, need):
+        """Samples a component in batches.
+
+        Parameters:
+            groups (list<tuple<int, tuple<int>>>): each group's size and the
+                numbers it touches.
+            need (list<int>): the pokemon each number needs.
+
+        Returns:
+            (list<tuple>): each batch's result from sample_component.
+        """
+        key = "{}:{}:{}".format(self._seed, len(groups), sum(need))
+        jobs = [(groups, need, "{}:{}".format(key, batch), self._samples)
+                for batch in range(self._batches)]
+        pool = self.get_pool()
+        if pool is None:
+            return [sample_component(job) for job in jobs]
+        return list(pool.map(sample_component, jobs))
+
+    def close(self):
+        """Shuts down the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+class ProbabilityEngine(object):
+    """Works out the exact chance that each covered cell hides a pokemon,
+    given the numbers showing and the number of pokemon left.
+
+    The covered cells next to numbers (the frontier) are split into
+    components that share no number. Each component is enumerated by
+    backtracking over groups of cells that touch the same numbers, which
+    gives the weight of every pokemon count in it. Components are combined
+    with each other and with the covered cells away from the frontier by
+    binomial weighting. Component results are memoised by their
+    constraints, so after a click only the components it touched are
+    enumerated again. Components with too many groups to enumerate are
+    sampled by an estimator instead, and the spread between its batches
+    gives confidence intervals for the chances.
+    """
+    def __init__(self, solver, estimator=None, exact_groups=EXACT_GROUPS):
+        """Constructs an engine that builds on a solver's deductions.
+
+        Parameters:
+            solver (ConstraintSolver): the solver for the game.
+            estimator (MonteCarloEstimator): samples large components, or
+                None to always enumerate.
+            exact_groups (int): the most groups a component may have to be
+                enumerated when there is an estimator.
+        """
+        self._solver = solver
+        self._board_model = solver.get_board_model()
+        self._estimator = estimator
+        self._exact_groups = exact_groups
+        self._numbers = set() #Numbers that may still touch unknown cells
+        self._memo = {} #Component -> enumeration
+        self._batches = {} #Sampled component -> each batch's estimate
+        self.update(range(self._board_model.get_grid_size()**2))
+
+    def update(self, changed):
+        """Notes newly revealed numbers. The solver must be updated too.
+
+        Parameters:
+            changed (iterable<int>): the indexes of the changed cells.
+        """
+        for index in changed:
+            if self._board_model.get_cell(index) in NUMBERS:
+                self._numbers.add(index)
+
+    def components(self):
+        """Splits the constraints of the numbers into independent components.
+
+        Returns:
+            (list<frozenset>): each component's constraints, as
+            (unknown cells (frozenset<int>), pokemon among them (int)).
+        """
+        self._solver.solve() #So the constraints and the solver's deductions agree
+        constraints = set()
+        for index in list(self._numbers):
+            unknown, pokemon = self._solver.constraint(index)
+            if unknown:
+                constraints.add((unknown, pokemon))
+            else: #Unknown cells only ever become known
+                self._numbers.discard(index)
+
+        parent = {}
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        for unknown, _ in constraints:
+            root = None
+            for cell in unknown:
+                cell = find(parent.setdefault(cell, cell))
+                if root is None:
+                    root = cell
+                elif cell != root:
+                    parent[cell] = root
+
+        components = {}
+        for constraint in constraints:
+            components.setdefault(find(next(iter(constraint[0]))), []).append(constraint)
+        return [frozenset(component) for component in components.values()]
+
+    def solve_component(self, component):
+        """Enumerates the ways to place pokemon in a component, from the memo
+        if it has been enumerated before.
+
+        Parameters:
+            component (frozenset): the component's constraints.
+
+        Returns:
+            (tuple): the groups of cells that touch the same numbers
+            (list<tuple<int>>), the number of placements with each pokemon
+            count (list<int>), and for each group the pokemon it holds summed
+            over the placements with each count (list<list<int>>).
+        """
+        if component not in self._memo:
+            groups, need = self.group_component(component)
+            if self._estimator is not None and len(groups) > self._exact_groups:
+                self._memo[component] = self.sample_component(component, groups, need)
+            else:
+                self._memo[component] = self.enumerate_component(groups, need)
+        return self._memo[component]
+
+    def group_component(self, component):
+        """Groups a component's cells by the numbers they touch.
+
+        Parameters:
+            component (frozenset): the component's constraints.
+
+        Returns:
+            (tuple): the groups, as the numbers they touch and their cells
+            (list<tuple<tuple<int>, list<int>>>), and the pokemon each
+            number needs (list<int>).
+        """
+        constraints = sorted(component, key=lambda constraint: min(constraint[0]))
+        membership = {}
+        for number, (unknown, _) in enumerate(constraints):
+            for cell in unknown:
+                membership.setdefault(cell, []).append(number)
+        classes = {}
+        for cell, numbers in membership.items():
+            classes.setdefault(tuple(numbers), []).append(cell)
+        return sorted(classes.items()), [pokemon for _, pokemon in constraints]
+
+    def sample_component(self, component, groups, need):
+        """Estimates a component with the estimator, keeping each batch's
+        estimate for the confidence intervals.
+
+        Parameters:
+            component (frozenset): the component's constraints.
+            groups (list<tuple>): the component's groups of cells.
+            need (list<int>): the pokemon each number needs.
+
+        Returns:
+            (tuple): as for solve_component, with estimated weights.
+        """
+        batches = self._estimator.estimate([(len(cells), numbers) for numbers, cells in groups], need)
+        self._batches[component] = batches
+        weights = [sum(column) for column in zip(*(batch[0] for batch in batches))]
+        group_pokemon = [[sum(column) for column in zip(*counts)]
+                         for counts in zip(*(batch[1] for batch in batches))]
+        return [tuple(cells) for _, cells in groups], weights, group_pokemon
+
+    def enumerate_component(self, groups, need):
+        """Enumerates a component by backtracking over its groups of cells,
+        choosing how many pokemon each group holds.
+
+        Parameters:
+            groups (list<tuple>): the component's groups of cells.
+            need (list<int>): the pokemon each number needs.
+
+        Returns:
+            (tuple): as for solve_component.
+        """
+        need = list(need) #Pokemon still to place per number
+        remaining = [0]*len(need) #Cells still to decide per number
+        for numbers, cells in groups:
+            for number in numbers:
+                remaining[number] += len(cells)
+        size = sum(len(cells) for _, cells in groups)
+        weights = [0]*(size + 1)
+        group_pokemon = [[0]*(size + 1) for _ in groups]
+        chosen = [0]*len(groups)
+
+        def search(group, total, ways):
+            if group == len(groups):
+                weights[total] += ways
+                for number, pokemon in enumerate(chosen):
+                    if pokemon:
+                        group_pokemon[number][total] += ways*pokemon
+                return
+
+            numbers, cells = groups[group]
+            for number in numbers:
+                remaining[number] -= len(cells)
+            low = max(0, max(need[number] - remaining[number] for number in numbers))
+            high = min(len(cells), min(need[number] for number in numbers))
+            for pokemon in range(low, high + 1):
+                for number in numbers:
+                    need[number] -= pokemon
+                chosen[group] = pokemon
+                search(group + 1, total + pokemon, ways*math.comb(len(cells), pokemon))
+                for number in numbers:
+                    need[number] += pokemon
+            chosen[group] = 0
+            for number in numbers:
+                remaining[number] += len(cells)
+
+        search(0, 0, 1)
+        return [tuple(cells) for _, cells in groups], weights, group_pokemon
+
+    def probabilities(self):
+        """Works out the chance of a pokemon in every covered cell.
+
+        Returns:
+            (tuple): the chance for each frontier cell and deduced cell
+            (dict<int, float>), and the chance for every other covered cell
+            (float, or None if there are none).
+        """
+        return self.combine([self.solve_component(component) for component in self.prune()])
+
+    def prune(self):
+        """Finds the current components and forgets results for old ones.
+
+        Returns:
+            (list<frozenset>): the components.
+        """
+        components = self.components()
+        self._memo = {component: self._memo[component] for component in components
+                      if component in self._memo}
+        self._batches = {component: self._batches[component] for component in components
+                         if component in self._batches}
+        return components
+
+    def combine(self, results):
+        """Combines the results of the components into chances.
+
+        Parameters:
+            results (list<tuple>): each component's result, as returned by
+                solve_component.
+
+        Returns:
+            (tuple): as for probabilities.
+        """
+        safe, known = self._solver.get_safe(), self._solver.get_pokemon()
+        known_covered = [index for index in known if self._board_model.get_cell(index) != POKEMON]
+        left = self._board_model.get_num_pokemon() - len(known)
+        covered = self._board_model.count_cells(UNEXPOSED) + self._board_model.count_cells(FLAG)
+        frontier = sum(len(weights) - 1 for _, weights, _ in results)
+        interior = covered - frontier - len(safe) - len(known_covered)
+
+        #Ways to place the rest in the interior for each frontier pokemon count
+        interior_weights = [math.comb(interior, left - pokemon) if 0 <= left - pokemon <= interior else 0
+                            for pokemon in range(frontier + 1)]
+
+        #Distributions of the pokemon in the components before and after each one
+        prefixes = [[1]]
+        for _, weights, _ in results:
+            prefixes.append(convolve(prefixes[-1], weights))
+        suffixes = [[1]]
+        for _, weights, _ in reversed(results):
+            suffixes.append(convolve(suffixes[-1], weights))
+        suffixes.reverse()
+
+        total = prefixes[-1]
+        ways = sum(weight*interior_weights[pokemon] for pokemon, weight in enumerate(total))
+        chances = {index: 0.0 for index in safe}
+        chances.update((index, 1.0) for index in known_covered)
+        if ways == 0: #The numbers cannot all be right
+            return chances, None
+
+        for number, (groups, weights, group_pokemon) in enumerate(results):
+            others = convolve(prefixes[number], suffixes[number + 1])
+            factors = [sum(weight*interior_weights[pokemon + other] for other, weight in enumerate(others))
+                       for pokemon in range(len(weights))]
+            for cells, pokemon_counts in zip(groups, group_pokemon):
+                chance = sum(count*factor for count, factor in zip(pokemon_counts, factors))/(ways*len(cells))
+                chances.update((cell, chance) for cell in cells)
+
+        interior_chance = None
+        if interior:
+            interior_chance = sum(weight*interior_weights[pokemon]*(left - pokemon)
+                                  for pokemon, weight in enumerate(total))/(ways*interior)
+        return chances, interior_chance
+
+    def intervals(self):
+        """Works out the chances with confidence intervals. Chances that were
+        enumerated exactly have intervals of zero width.
+
+        Returns:
+            (tuple): the chance and interval half-width for each frontier
+            cell and deduced cell (dict<int, tuple<float, float>>), and the
+            same for every other covered cell (tuple<float, float>, or None
+            if there are none).
+        """
+        components = self.prune()
+        results = [self.solve_component(component) for component in components]
+        chances, interior_chance = self.combine(results)
+        sampled = [number for number, component in enumerate(components) if component in self._batches]
+        runs = []
+        if sampled:
+            for batch in range(len(self._batches[components[sampled[0]]])):
+                batch_results = list(results)
+                for number in sampled:
+                    batch_results[number] = (results[number][0],) + tuple(self._batches[components[number]][batch])
+                run = self.combine(batch_results)
+                if len(run[0]) == len(chances): #Skip batches that drew no layouts
+                    runs.append(run)
+
+        def interval(estimate, samples):
+            if not sampled:
+                return estimate, 0.0
+            if len(samples) < 2:
+                return estimate, float("inf")
+            mean = sum(samples)/len(samples)
+            variance = sum((sample - mean)**2 for sample in samples)/(len(samples) - 1)
+            return estimate, CONFIDENCE_Z*math.sqrt(variance/len(samples))
+
+        cell_intervals = {index: interval(chance, [run[0][index] for run in runs])
+                          for index, chance in chances.items()}
+        if interior_chance is None:
+            return cell_intervals, None
+        return cell_intervals, interval(interior_chance, [run[1] for run in runs if run[1] is not None])
+
+    def best_guess(self):
+        """Picks the tall grass cell least likely to hide a pokemon. Flagged
+        cells are left alone, as clicking them does nothing.
+
+        Returns:
+            (int): the cell's index, or None if there is no tall grass left.
+        """
+        chances, interior_chance = self.probabilities()
+        board_model = self._board_model
+        guess = min(((chance, index) for index, chance in chances.items()
+                     if index not in self._solver.get_pokemon() and board_model.get_cell(index) == UNEXPOSED),
+                    default=None)
+        if interior_chance is not None and (guess is None or interior_chance < guess[0]):
+            for index, cell in enumerate(board_model.get_game()):
+                if cell == UNEXPOSED and index not in chances:
+                    return index
+        return None if guess is None else guess[1]
+
+class GuessFinder(object):
+    """Finds the best guess on the file worker thread, so enumerating and
+    sampling never stall the window. It keeps its own copy of the game with
+    a solver and probability engine that are only used on the worker. The
+    main thread passes it the cells changed since the last guess, so
+    components that did not change are not enumerated or sampled again.
+    """
+    def __init__(self, board_model, estimator):
+        """Constructs a finder for a copy of the game.
+
+        Parameters:
+            board_model (BoardModel): a copy of the game, owned by the finder.
+            estimator (MonteCarloEstimator): samples large components.
+        """
+        self._board_model = board_model
+        self._estimator = estimator
+        self._solver = None
+        self._engine = None
+
+    def find(self, changes, progress=None):
+        """Brings the copy of the game up to date and picks the tall grass
+        cell least likely to hide a pokemon. Runs on the worker thread.
+
+        Parameters:
+            changes (list<tuple<int, str>>): the index and new character of
+            each cell changed since the last guess.
+            progress (callable): unused; passed by the file worker.
+
+        Returns:
+            (int): the cell's index, or None if there is no tall grass left.
+        """
+        for index, cell in changes:
+            self._board_model.replace_character_at_index(cell, index)
+        if self._engine is None:
+            self._solver = ConstraintSolver(self._board_model)
+            self._engine = ProbabilityEngine(self._solver, self._estimator)
+        else:
+            indexes = [index for index, _ in changes]
+            self._solver.update(indexes)
+            self._engine.update(indexes)
+        return self._engine.best_guess()
+
+def board_from_save(game, pokemon_locations, seed):
+    """Builds a board model from the contents of a save.
+
+    Parameters:
+        game (str): the game string.
+        pokemon_locations (tuple<int>): the pokemon indexes.
+        seed (int): the board seed, or None to keep a random one.
+
+    Returns:
+        (BoardModel): the saved game.
+    """
+    board_model = BoardModel(math.isqrt(len(game)), 0)
+    board_model.set_pokemon_locations(pokemon_locations)
+    if seed is not None:
+        board_model.set_seed(seed)
+    board_model.set_game(game)
+    return board_model
+
+class MoveJournal(object):
+    """Autosaves a game by appending each change to a journal file and
+    periodically writing a checkpoint of the whole game. After a crash the
+    game is recovered from the checkpoint and the changes journalled since.
+    Reveals are journalled as the cells they actually uncovered, so a
+    cascade cut short by a flag is recovered as it was played.
+
+    The journal starts with the checksum of the checkpoint it follows, so
+    records that are already part of a newer checkpoint are never replayed.
+    Checkpoints are written in three steps so the encoding can run on a
+    worker thread: start_checkpoint on the main thread when the game is
+    copied, write_checkpoint on the worker, then finish_checkpoint back on
+    the main thread. Records made in between go to both the old journal and
+    the new one.
+    """
+    def __init__(self, directory, interval=CHECKPOINT_INTERVAL, sync_every=JOURNAL_SYNC):
+        """Constructs a journal that keeps its files in the given directory.
+
+        Parameters:
+            directory (str): the directory for the checkpoint and journal files.
+            interval (int): the records written between checkpoints.
+            sync_every (int): the records written between fsyncs.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._checkpoint_file = os.path.join(directory, "checkpoint" + SAVE_EXTENSION)
+        self._journal_file = os.path.join(directory, "journal.bin")
+        self._interval = interval
+        self._sync_every = sync_every
+        self._journal = None
+        self._records = 0 #Since the last checkpoint
+        self._unsynced = 0
+        self._pending = None #Records since the copy for a checkpoint still being written
+        self._generation = 0 #The latest checkpoint started
+
+    def recover(self):
+        """Rebuilds the autosaved game from the checkpoint and journal, and
+        removes checkpoints that were never finished.
+
+        Returns:
+            (tuple): the board model (BoardModel) and time elapsed in seconds
+            (int), or None if there is no autosave or its game has ended.
+        """
+        directory, prefix = os.path.split(self._checkpoint_file + ".")
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith(".tmp"):
+                os.remove(os.path.join(directory, name))
+
+        try:
+            game, pokemon_locations, time_elapsed, seed = read_save(self._checkpoint_file)
+        except (OSError, ValueError):
+            return None
+        board_model = board_from_save(game, pokemon_locations, seed)
+
+        try:
+            with open(self._journal_file, "rb") as journal:
+                data = journal.read()
+        except OSError:
+            data = b""
+        if data[:JOURNAL_HEADER.size] == self.journal_header():
+            #A partly written last record is ignored
+            end = len(data) - (len(data) - JOURNAL_HEADER.size) % JOURNAL_RECORD.size
+            for action, index, time_elapsed in JOURNAL_RECORD.iter_unpack(data[JOURNAL_HEADER.size:end]):
+                board_model.apply_action(action, index)
+        if board_model.check_loss() or board_model.check_win():
+            return None #Finished games are not resumed
+        return board_model, time_elapsed
+
+    def journal_header(self):
+        """Builds the journal header for the current checkpoint.
+
+        Returns:
+            (bytes): the header.
+        """
+        with open(self._checkpoint_file, "rb") as checkpoint:
+            checkpoint.seek(-SAVE_CHECKSUM.size, os.SEEK_END)
+            return JOURNAL_HEADER.pack(JOURNAL_MAGIC, *SAVE_CHECKSUM.unpack(checkpoint.read()))
+
+    def checkpoint(self, board_model, time_elapsed):
+        """Writes a checkpoint of the whole game and starts a new, empty
+        journal, all on the calling thread.
+
+        Parameters:
+            board_model (BoardModel): the game to save.
+            time_elapsed (int): the time elapsed in seconds.
+        """
+        generation = self.start_checkpoint(True)
+        self.finish_checkpoint(self.write_checkpoint(board_model, time_elapsed, generation))
+
+    def start_checkpoint(self, replaced=False):
+        """Starts a checkpoint of a copy of the game just taken. Records made
+        from now on are kept for the journal that will follow it.
+
+        Parameters:
+            replaced (bool): True if the game was replaced rather than
+            changed by clicks, so the old journal must not be added to.
+
+        Returns:
+            (int): the checkpoint's generation, for write_checkpoint.
+        """
+        if replaced and self._journal is not None:
+            self.close()
+        self._generation += 1
+        self._pending = []
+        return self._generation
+
+    def get_temp_file(self, generation):
+        """Names the file a checkpoint is written to before it is complete.
+
+        Parameters:
+            generation (int): the checkpoint's generation.
+
+        Returns:
+            (str): the file name.
+        """
+        return "{}.{}.tmp".format(self._checkpoint_file, generation)
+
+    def write_checkpoint(self, board_model, time_elapsed, generation, progress=None):
+        """Encodes a checkpoint and writes it to its temporary file. Only
+        reads the copy of the game, so it can run on a worker thread.
+
+        Parameters:
+            board_model (BoardModel): the copy of the game to save.
+            time_elapsed (int): the time elapsed in seconds.
+            generation (int): the checkpoint's generation.
+            progress (callable): called with the bytes written and total, or None.
+
+        Returns:
+            (int): the generation, for finish_checkpoint.
+        """
+        with open(self.get_temp_file(generation), "wb") as checkpoint:
+            write_chunks(checkpoint, encode_save(board_model, time_elapsed), progress)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        return generation
+
+    def finish_checkpoint(self, generation):
+        """Puts a written checkpoint in place and starts the journal that
+        follows it with the records made since the copy. A checkpoint
+        overtaken by a newer one is discarded.
+
+        Parameters:
+            generation (int): the checkpoint's generation.
+        """
+        temp_file = self.get_temp_file(generation)
+        if generation != self._generation:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            return
+
+        os.replace(temp_file, self._checkpoint_file)
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self._journal_file, "wb")
+        self._journal.write(self.journal_header())
+        self._journal.write(b"".join(self._pending))
+        self.sync()
+        self._records = len(self._pending)
+        self._pending = None
+
+    def replace_game(self):
+        """Closes the journal when the game is replaced. The new game is not
+        copied straight away, which for a large loaded game would copy all of
+        it; its first change makes a checkpoint due instead. A checkpoint of
+        the old game still being written is discarded.
+        """
+        self.close()
+        self._generation += 1
+        self._pending = None
+        self._records = self._interval - 1 #The next record makes a checkpoint due
+
+    def abandon_checkpoint(self, generation):
+        """Cleans up after a checkpoint that could not be written, so
+        journalling carries on and the checkpoint is tried again later.
+
+        If the journal is still open it already holds every record since the
+        last checkpoint, so it is flushed and a new checkpoint waits for
+        another interval. If it was closed because the game was replaced,
+        the old checkpoint no longer describes the game and is removed, and a
+        new checkpoint is due at the next change.
+
+        Parameters:
+            generation (int): the checkpoint's generation.
+        """
+        try:
+            os.remove(self.get_temp_file(generation))
+        except OSError:
+            pass
+        if generation != self._generation:
+            return #A newer checkpoint is already being written
+
+        self._pending = None
+        if self._journal is not None:
+            self.sync()
+            self._records = 0
+        else:
+            try:
+                os.remove(self._checkpoint_file)
+            except OSError:
+                pass
+            self._records = self._interval
+
+    def record(self, action, index, time_elapsed):
+        """Appends a flag or a click to the journal.
+
+        Parameters:
+            action (int): ACTION_FLAG, or ACTION_REVEAL for a reveal that is
+            applied in one go.
+            index (int): Game string index.
+            time_elapsed (int): the time elapsed in seconds.
+        """
+        self.write(JOURNAL_RECORD.pack(action, index, time_elapsed))
+
+    def record_cells(self, indexes, time_elapsed):
+        """Appends the cells a reveal uncovered to the journal.
+
+        Parameters:
+            indexes (list<int>): the indexes of the uncovered cells.
+            time_elapsed (int): the time elapsed in seconds.
+        """
+        if indexes:
+            self.write(b"".join(JOURNAL_RECORD.pack(ACTION_EXPOSE, index, time_elapsed)
+                                for index in indexes))
+
+    def write(self, data):
+        """Appends records to the journal, and keeps them for the next one if
+        a checkpoint is being written.
+
+        Parameters:
+            data (bytes): the packed records.
+        """
+        if self._pending is not None:
+            self._pending.append(data)
+        self._records += 1
+        if self._journal is not None:
+            self._journal.write(data)
+            self._unsynced += 1
+            if self._unsynced >= self._sync_every:
+                self.sync()
+
+    def checkpoint_due(self):
+        """Checks whether enough changes have been journalled since the last
+        checkpoint to write a new one.
+
+        Returns:
+            (bool): True if a checkpoint is due and none is being written.
+        """
+        return self._pending is None and self._records >= self._interval
+
+    def is_up_to_date(self):
+        """Checks whether the autosave holds the current game, that is its
+        checkpoint has been written and its journal is open.
+
+        Returns:
+            (bool): True if every change is in the autosave.
+        """
+        return self._pending is None and self._journal is not None
+
+    def is_checkpoint_pending(self):
+        """Checks whether a checkpoint has been started but not finished.
+
+        Returns:
+            (bool): True if a checkpoint is being written.
+        """
+        return self._pending is not None
+
+    def sync(self):
+        """Flushes the journal to disk."""
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        """Flushes and closes the journal."""
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+class ReplayRecorder(object):
+    """Records the moves of a game from its starting state so it can be
+    saved as a replay file. Reveals are recorded as the cells each batch of
+    a cascade actually uncovered, like the autosave journal, so a flag
+    placed while a cascade is still spreading replays as it was played.
+    """
+    def __init__(self, board_model):
+        """Starts recording a game from the board's current state. The game
+        is only copied by prepare, just before its first move.
+
+        Parameters:
+            board_model (BoardModel): the game to record.
+        """
+        self._board_model = board_model
+        self._start_model = None #Only encoded when the replay is saved
+        self._actions = []
+        self._start = time.monotonic()
+
+    def prepare(self):
+        """Copies the starting game if it has not been copied yet. Called
+        just before every move, so a game that is loaded and never played is
+        never copied.
+        """
+        if self._start_model is None:
+            self._start_model = self._board_model.snapshot()
+
+    def record(self, action, index):
+        """Records a flag, or a click that is applied in one go.
+
+        Parameters:
+            action (int): ACTION_FLAG or ACTION_REVEAL.
+            index (int): Game string index.
+        """
+        milliseconds = int((time.monotonic() - self._start)*1000)
+        self._actions.append((action, index, milliseconds))
+
+    def record_cells(self, indexes):
+        """Records the cells uncovered by one batch of a reveal. They share a
+        time, so they are replayed as one move.
+
+        Parameters:
+            indexes (list<int>): the indexes of the uncovered cells.
+        """
+        milliseconds = int((time.monotonic() - self._start)*1000)
+        self._actions.extend((ACTION_EXPOSE, index, milliseconds) for index in indexes)
+
+    def save(self, file_name):
+        """Writes the recording to a replay file.
+
+        Parameters:
+            file_name (str): the file to write.
+        """
+        self.prepare()
+        start_game = encode_save(self._start_model, 0)
+        with open(file_name, "wb") as replay_file:
+            replay_file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION,
+                                                 len(self._actions), len(start_game)))
+            replay_file.write(start_game)
+            for record in self._actions:
+                replay_file.write(REPLAY_RECORD.pack(*record))
+
+class ReplayEngine(object):
+    """Steps through a recorded game one move at a time, where a move is a
+    flag, a click, or the cells uncovered together by one batch of a
+    reveal. The game is kept every REPLAY_CHECKPOINT moves as it is first
+    played, so seeking only replays the moves after the nearest kept game.
+    """
+    def __init__(self, board_model, actions, interval=REPLAY_CHECKPOINT):
+        """Constructs an engine at the start of a recording.
+
+        Parameters:
+            board_model (BoardModel): the game before the first move.
+            actions (list<tuple>): (action, index, milliseconds) for each record.
+            interval (int): the moves between kept games.
+        """
+        self._board_model = board_model
+        self._actions = actions
+        self._interval = interval
+        self._checkpoints = [board_model.get_game()] #Game after every interval moves
+        self._move = 0
+
+        #Index of the first record of each move, then the number of records
+        self._moves = []
+        for number, (action, _, milliseconds) in enumerate(actions):
+            if not (action == ACTION_EXPOSE and number and actions[number - 1][0] == ACTION_EXPOSE
+                    and actions[number - 1][2] == milliseconds):
+                self._moves.append(number)
+        self._moves.append(len(actions))
+
+    def get_board_model(self):
+        """Retrieves the game being replayed.
+
+        Returns:
+            self._board_model (BoardModel): the game at the current click.
+        """
+        return self._board_model
+
+    def get_move(self):
+        """Retrieves the number of moves replayed so far.
+
+        Returns:
+            self._move (int): the current move.
+        """
+        return self._move
+
+    def get_num_moves(self):
+        """Retrieves the number of moves in the recording.
+
+        Returns:
+            (int): the number of moves.
+        """
+        return len(self._moves) - 1
+
+    def get_time(self, move):
+        """Retrieves when a move was made.
+
+        Parameters:
+            move (int): the move, from 0.
+
+        Returns:
+            (int): milliseconds since the start of the game.
+        """
+        return self._actions[self._moves[move]][2]
+
+    def step(self):
+        """Replays the next move.
+
+        Returns:
+            (list<int>): the indexes of the changed cells.
+        """
+        changed = []
+        for action, index, _ in self._actions[self._moves[self._move]:self._moves[self._move + 1]]:
+            changed += self._board_model.apply_action(action, index)
+        self._move += 1
+        if self._move == len(self._checkpoints)*self._interval:
+            self._checkpoints.append(self._board_model.get_game())
+        return changed
+
+    def seek(self, move):
+        """Moves to the game after the given number of moves, starting from
+        the nearest kept game at or before it.
+
+        Parameters:
+            move (int): the number of moves to have replayed.
+        """
+        move = max(0, min(move, self.get_num_moves()))
+        checkpoint = min(move//self._interval, len(self._checkpoints) - 1)
+        if move < self._move or checkpoint*self._interval > self._move:
+            self._board_model.set_game(self._checkpoints[checkpoint])
+            self._move = checkpoint*self._interval
+
+        while self._move < move:
+            self.step()
+
+def read_replay(file_name):
+    """Reads a replay file written by ReplayRecorder.save.
+
+    Parameters:
+        file_name (str): the file to read.
+
+    Returns:
+        (ReplayEngine): an engine at the start of the recording.
+    """
+    with open(file_name, "rb") as replay_file:
+        data = replay_file.read()
+
+    if len(data) < REPLAY_HEADER.size:
+        raise ValueError("Replay file is truncated")
+    magic, version, count, start_length = REPLAY_HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC:
+        raise ValueError("Not a replay file")
+    if version != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay file version {version}")
+
+    records_start = REPLAY_HEADER.size + start_length
+    if len(data) != records_start + count*REPLAY_RECORD.size:
+        raise ValueError("Replay file is truncated")
+    game, pokemon_locations, _, seed = decode_save(data[REPLAY_HEADER.size:records_start])
+    actions = list(REPLAY_RECORD.iter_unpack(data[records_start:]))
+    return ReplayEngine(board_from_save(game, pokemon_locations, seed), actions)
+
+_UNCOVERED = re.compile("[^" + re.escape(UNEXPOSED) + "]") #Any cell that is not tall grass
+
+class PokemonGame(object):
+    """This is the controller class for the pokemon game. This class is responsible
+    for the interaction between the visible interface and the back end game state.
+    """
+    def __init__(self, master, grid_size=10, num_pokemon=15, task=TASK_TWO):
+        """Constructs a game for the given grid size, number of pokemon and task in
+        the specified master window.
+
+        Parameters:
+            master (str): the window in which to display the game (typically, root).
+            grid_size (int): the size of the game.
+            num_pokemon (int): the number of hidden pokemon.
+            task (str): the specified task number.
+        """
+        super().__init__()
+        self._master = master
+        self._grid_size = grid_size
+        self._num_pokemon = num_pokemon
+        self._task = task
+
+        #Window Configuration
+        self._master.title("Pokemon: Got2 Find Them All!")
+
+        self._title = tk.Label(master, text = "Pokemon: Got 2 Find Them All!", bg="#d46e69", fg="white")
+        self._title.config(font=("Comic Sans MS", 16, "bold"))
+        self._title.pack(side = tk.TOP, anchor=tk.N, fill=tk.X)
+
+        #Game Initialisation
+        self.board_model = BoardModel(grid_size, num_pokemon)
+        self._status_job = None
+        self._reveals = [] #Reveal cascades still being applied
+        self._reveal_job = None
+        self.end = None #Game over dialog, created on the first game over
+        self.journal = None #MoveJournal, once autosave is started
+        self._worker = None #FileWorker, started on first use
+        self._solver = None #ConstraintSolver, created when a hint is asked for
+        self._finder = None #GuessFinder, created when no cell is certainly safe
+        self._finder_changes = [] #(index, cell) changed since the finder's last guess
+        self._changes = 0 #Times the game has changed, so a stale guess is not shown
+        self._guess = None #self._changes when the guess being found was asked for
+        self.estimator = MonteCarloEstimator() #Samples frontiers too large to enumerate
+        self.replay = ReplayRecorder(self.board_model)
+        
+        if task == 1:
+            self.board_view = BoardView(master, grid_size)
+            self.board_view.draw_board(self.board_model.get_cells())
+        
+        elif task == 2:
+            self.board_view = ImageBoardView(master, grid_size)
+            self.board_view.set_sprites(self.board_model.get_sprites())
+            self.board_view.draw_board(self.board_model.get_cells())
+            self.status_bar = StatusBar(master, num_pokemon, self.board_model.get_cells())
+            self.status_bar.pack(side=tk.TOP, anchor=tk.N)
+            self.file_menu = FileMenu(master)
+            
+        #Bindings
+        self.board_view.bind('<Button-3>', self.right_click)
+        self.board_view.bind('<Button-2>', self.right_click)
+        self.board_view.bind("<Button-1>", self.left_click)
+        self._master.bind("<h>", self.hint)
+        self._master.bind("<f>", self.auto_flag)
+        self._master.bind("<s>", self.reveal_safe)
+        
+
+    def check_game_state(self):
+        """This function is called on every left or right click to check the game
+        state and if a win or loss has occurred, create the necessary end of game
+        popup window.
+        """
+        if self.journal is not None and self.journal.checkpoint_due() and not self._reveals:
+            self.checkpoint()
+
+        self._game_state = ""
+        win = self.board_model.check_win()
+        loss = self.board_model.check_loss()
+        
+        if win == 1:
+            self._game_state = "You won!"
+
+        elif loss == 1:
+            self._game_state = "You lose."
+        
+        if self._game_state != "":
+            self.cancel_reveals()
+            if self.end is None:
+                self.create_end_dialog()
+            self._end_text.set(self._game_state)
+            self.end.deiconify()
+            self.end.lift()
+
+    def create_end_dialog(self):
+        """Creates the end of game popup window. The window is hidden rather than
+        destroyed when closed, so the same one is shown after every game.
+        """
+        self.end = tk.Toplevel(self._master)
+        self.end.title("Game over")
+        self.end.geometry("400x125")
+        self.end.protocol("WM_DELETE_WINDOW", self.end.withdraw)
+
+        self._end_text = tk.StringVar(self.end)
+        label1 = tk.Label(self.end, textvariable=self._end_text, pady=5)
+        label1.config(font=12)
+        label1.pack()
+
+        label2 = tk.Label(self.end, text="Would you like to play again?", pady=10)
+        label2.config(font=10)
+        label2.pack()
+
+        button1 = tk.Button(self.end, text="Yes", command=self.restart)
+        button1.pack(side=tk.LEFT, anchor=tk.N, ipadx=20, pady=10, expand=1)
+
+        button1 = tk.Button(self.end, text="No", command=self.exit)
+        button1.pack(side=tk.LEFT, anchor=tk.N, ipadx=20, pady=10, expand=1)            
+
+    def left_click(self, e):
+        """This function handles the left click event. When called, this function
+        updates the game board with the new game string and calls for the GUI to
+        be updated.
+
+        Parameters:
+            e (tuple): the coordinates of the mouse when pressed.
+        """
+        index = self.board_view.pixel_to_index((e.x, e.y))
+        if index is None: #Outside a zoomed out board
+            return
+
+        if self.board_model.get_cell(index) == UNEXPOSED: #If tall grass
+            self.replay.prepare()
+            if index in self.board_model.get_pokemon_locations(): #If pokemon
+                changed = self.board_model.catch_pokemon()
+                self.record_action(ACTION_REVEAL, index)
+                self.refresh(changed)
+
+            else:
+                #Cascades are applied over several ticks by run_reveals
+                self._reveals.append(self.board_model.reveal_cells(index))
+                if self._reveal_job is None:
+                    self.run_reveals()
+                return
+        
+        self.check_game_state()
+
+    def run_reveals(self):
+        """Applies the queued reveal cascades for up to REVEAL_BUDGET seconds and
+        then hands control back to the event loop, so clicks and the timer stay
+        responsive during a big cascade. The revealed cells are drawn as they
+        go, which shows the cascade spreading across the board.
+        """
+        self._reveal_job = None
+        changed = []
+        deadline = time.perf_counter() + REVEAL_BUDGET
+
+        while self._reveals and time.perf_counter() < deadline:
+            try:
+                changed += next(self._reveals[0])
+            except StopIteration:
+                self._reveals.pop(0)
+
+        self.record_reveals(changed)
+        self.refresh(changed)
+        if self._reveals:
+            self._reveal_job = self._master.after(1, self.run_reveals)
+        else:
+            self.check_game_state()
+
+    def cancel_reveals(self):
+        """Stops any reveal cascades that have not finished."""
+        if self._reveal_job is not None:
+            self._master.after_cancel(self._reveal_job)
+            self._reveal_job = None
+        self._reveals = []
+
+    def right_click(self, e):
+        """This function handles the right click event. When called, this function
+        updates the game board with the new game string and calls for the GUI to
+        be updated.
+
+        Parameters:
+            e (tuple): the coordinates of the mouse when pressed.
+        """
+        index = self.board_view.pixel_to_index((e.x, e.y))
+        if index is None:
+            return
+
+        self.replay.prepare()
+        if self.board_model.toggle_flag(index):
+            self.record_action(ACTION_FLAG, index)
+            
+        self.refresh([index])
+        self.check_game_state()
+
+    def get_time(self):
+        """Retrieves the time elapsed in the game.
+
+        Returns:
+            (int): the time elapsed in seconds, or 0 without a status bar.
+        """
+        if self._task == 2:
+            return self.status_bar.get_time()
+        return 0
+
+    def start_autosave(self, directory=AUTOSAVE_DIR):
+        """Starts autosaving every click to the given directory, first
+        recovering the game autosaved there if there is one.
+
+        Parameters:
+            directory (str): the autosave directory.
+        """
+        self.journal = MoveJournal(directory)
+        recovered = self.journal.recover()
+        if recovered is not None:
+            self.replace_board(*recovered)
+        else:
+            self.journal.replace_game()
+
+    def replace_board(self, board_model, time_elapsed):
+        """Swaps in a whole new game, such as a loaded save, and redraws it.
+        The new game may have a different size and number of pokemon, which
+        are then used for new games too.
+
+        Parameters:
+            board_model (BoardModel): the new game.
+            time_elapsed (int): the time elapsed in the new game in seconds.
+        """
+        self.cancel_reveals()
+        self.board_model.close()
+        self.board_model = board_model
+        self._num_pokemon = board_model.get_num_pokemon()
+        if board_model.get_grid_size() != self._grid_size:
+            self._grid_size = board_model.get_grid_size()
+            self.board_view.set_grid_size(self._grid_size)
+        if self._task == 2:
+            self.board_view.set_sprites(self.board_model.get_sprites())
+            self.status_bar.set_num_pokemon(self._num_pokemon)
+            self.status_bar.set_time(time_elapsed)
+            self.update_status()
+        self.board_view.draw_board(self.board_model.get_cells())
+        self.start_recording()
+        self.check_game_state()
+
+    def record_action(self, action, index):
+        """Records a flag, or a click on a pokemon, for replays and in the
+        autosave journal, if autosave is on. Other reveals are recorded by
+        record_reveals as their cells are uncovered.
+
+        Parameters:
+            action (int): ACTION_FLAG or ACTION_REVEAL.
+            index (int): Game string index.
+        """
+        self.replay.record(action, index)
+        if self.journal is not None:
+            self.journal.record(action, index, self.get_time())
+
+    def record_reveals(self, changed):
+        """Records the cells a reveal uncovered for replays and in the
+        autosave journal, if autosave is on.
+
+        Parameters:
+            changed (list<int>): the indexes of the uncovered cells.
+        """
+        self.replay.record_cells(changed)
+        if self.journal is not None:
+            self.journal.record_cells(changed, self.get_time())
+
+    def start_recording(self):
+        """Starts a new replay recording, forgets the deductions about the
+        old game and starts journalling the new one. Called whenever the game
+        is replaced rather than changed by a click.
+        """
+        self.replay = ReplayRecorder(self.board_model)
+        self._solver = None
+        self._finder = None
+        self._changes += 1
+        if self.journal is not None:
+            self.journal.replace_game()
+
+    def checkpoint(self):
+        """Autosaves the whole game, if autosave is on. The game is copied
+        here and encoded and written by the file worker.
+        """
+        if self.journal is not None:
+            generation = self.journal.start_checkpoint()
+            self.get_worker().submit("Autosaving", self.journal.write_checkpoint,
+                                     (self.board_model.snapshot(), self.get_time(), generation),
+                                     self.journal.finish_checkpoint,
+                                     lambda error: self.journal.abandon_checkpoint(generation))
+
+    def get_worker(self):
+        """Retrieves the file worker, starting it on first use.
+
+        Returns:
+            self._worker (FileWorker): the file worker.
+        """
+        if self._worker is None:
+            self._worker = FileWorker(self._master, self.show_progress)
+        return self._worker
+
+    def show_progress(self, label, fraction):
+        """Shows the progress of a save, load or autosave in the window title.
+
+        Parameters:
+            label (str): what is being done, or None once everything is done.
+            fraction (float): how much of it is done, from 0 to 1.
+        """
+        title = "Pokemon: Got2 Find Them All!"
+        if label is not None:
+            title += f" - {label} {fraction:.0%}"
+        self._master.title(title)
+
+    def get_solver(self):
+        """Retrieves the solver for the current game, creating it on first use.
+
+        Returns:
+            self._solver (ConstraintSolver): the solver.
+        """
+        if self._solver is None or self._solver.get_board_model() is not self.board_model:
+            self._solver = ConstraintSolver(self.board_model)
+            self._finder = None
+        return self._solver
+
+    def hint(self, e=None):
+        """Outlines a cell that is certainly safe to reveal in blue or, if
+        none can be deduced from the numbers showing, the cell least likely
+        to hide a pokemon in orange. The guess is found on the file worker
+        and shown once it is ready, unless the game has changed by then.
+
+        Parameters:
+            e (tk.Event): the key press, if called from a binding.
+        """
+        index = self.get_solver().hint()
+        if index is not None:
+            self.board_view.show_hint(index)
+            return
+        if self._guess is not None:
+            return #A guess is already being found
+
+        if self._finder is None:
+            self._finder = GuessFinder(self.board_model.snapshot(), self.estimator)
+            self._finder_changes = []
+        self._guess = self._changes
+        self.get_worker().submit("Finding a guess", self._finder.find, (self._finder_changes,),
+                                 self.show_guess, self.guess_failed)
+        self._finder_changes = []
+
+    def show_guess(self, index):
+        """Outlines the guess found on the file worker in orange, if the game
+        has not changed since it was asked for.
+
+        Parameters:
+            index (int): the guess, or None if there is none.
+        """
+        current = self._guess == self._changes
+        self._guess = None
+        if index is not None and current:
+            self.board_view.show_hint(index, "orange")
+
+    def guess_failed(self, error):
+        """Forgets the guess finder after it failed, as its copy of the game
+        may be part way through an update.
+
+        Parameters:
+            error (Exception): the error, which the file worker shows.
+        """
+        self._finder = None
+        self._guess = None
+
+    def auto_flag(self, e=None):
+        """Flags every cell that certainly hides a pokemon, while there are
+        flags left.
+
+        Parameters:
+            e (tk.Event): the key press, if called from a binding.
+        """
+        self.replay.prepare()
+        changed = []
+        for index in sorted(self.get_solver().get_pokemon()):
+            if self.board_model.get_cell(index) == UNEXPOSED and self.board_model.toggle_flag(index):
+                self.record_action(ACTION_FLAG, index)
+                changed.append(index)
+        self.refresh(changed)
+        self.check_game_state()
+
+    def reveal_safe(self, e=None):
+        """Reveals every cell that is certainly safe, including the cells
+        that become certain as others are revealed.
+
+        Parameters:
+            e (tk.Event): the key press, if called from a binding.
+        """
+        self.cancel_reveals()
+        self.replay.prepare()
+        changed = []
+        while True:
+            index = self.get_solver().hint()
+            if index is None:
+                break
+            revealed = self.board_model.apply_action(ACTION_REVEAL, index)
+            self.record_reveals(revealed)
+            self._solver.update(revealed)
+            changed += revealed
+        self.refresh(changed)
+        self.check_game_state()
+
+    def refresh(self, changed=None):
+        """Schedules the views to be updated with the current game string.
+        Updates from several quick clicks are merged and drawn once per frame.
+
+        Parameters:
+            changed (list<int>): the indexes of the changed cells, or None if
+            the whole board changed.
+        """
+        self.board_view.schedule_redraw(self.board_model.get_cells(), changed)
+        self.board_view.clear_hint()
+        self._changes += 1
+        if changed is None:
+            self._solver = None
+            self._finder = None
+        else:
+            if self._solver is not None:
+                self._solver.update(changed)
+            if self._finder is not None:
+                self._finder_changes += [(index, self.board_model.get_cell(index)) for index in changed]
+
+        if self._task == 2 and self._status_job is None:
+            self._status_job = self._master.after_idle(self.update_status)
+
+    def update_status(self):
+        """Updates the status bar with the number of catches in the current
+        game string.
+        """
+        self._status_job = None
+        self.status_bar.update_num_catches(self.board_model.get_cells())
+
+    def restart(self):
+        """This function handles the restarting of the game from the end of game
+        popup by hiding the popup and starting a new game.
+        """
+        self.end.withdraw()
+        self.new_game()
+
+    def new_game(self):
+        """Starts a new game with new pokemon locations in the same window.
+        Only the board model is rebuilt; the views and their image caches are
+        kept and only the cells that had been uncovered are redrawn.
+        """
+        self.cancel_reveals()
+        old_game = self.board_model.get_game()
+        self.board_model.close()
+        self.board_model = BoardModel(self._grid_size, self._num_pokemon)
+        if self._task == 2:
+            self.board_view.set_sprites(self.board_model.get_sprites())
+        self.reset_views(old_game)
+        self.start_recording()
+
+    def restart_game(self):
+        """Restarts the current game with the same pokemon locations."""
+        self.cancel_reveals()
+        old_game = self.board_model.get_game()
+        self.board_model.set_game(UNEXPOSED * self._grid_size**2)
+        self.reset_views(old_game)
+        self.start_recording()
+
+    def reset_views(self, old_game):
+        """Redraws the cells that differ from a fresh board and resets the
+        timer after a new game or restart.
+
+        Parameters:
+            old_game (str): the game string before the reset.
+        """
+        changed = [match.start() for match in _UNCOVERED.finditer(old_game)]
+        if self.end is not None:
+            self.end.withdraw()
+        self.refresh(changed)
+        if self._task == 2:
+            self.status_bar.set_time(0)
+
+    def exit(self):
+        """This function handles the exiting of the game by closing all windows.
+        """
+        if self.journal is not None:
+            if not self.journal.is_up_to_date():
+                self.journal.checkpoint(self.board_model, self.get_time())
+            self.journal.close()
+        self.estimator.close()
+        self.board_model.close()
+        exit()
+
+class SaveLibrary(object):
+    """A directory of saved games with an SQLite index of each save's grid
+    size, number of pokemon, progress, time and modification time, so saves
+    can be listed, sorted and filtered without opening them. The index is
+    brought up to date with the directory by comparing modification times.
+    """
+    def __init__(self, directory=LIBRARY_DIR):
+        """Opens the library in the given directory, creating it if needed,
+        and syncs the index with the saves in it.
+
+        Parameters:
+            directory (str): the library directory.
+        """
+        #Imported here as the database is only needed for the library
+        import sqlite3
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._db = sqlite3.connect(os.path.join(directory, LIBRARY_INDEX))
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS saves ("
+                             "name TEXT PRIMARY KEY, grid_size INTEGER, num_pokemon INTEGER,"
+                             "progress REAL, time INTEGER, modified INTEGER, size INTEGER)")
+            for column in LIBRARY_COLUMNS[1:]:
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS saves_{column} ON saves ({column})")
+        self.sync()
+
+    def get_path(self, name):
+        """Retrieves the file of a save in the library.
+
+        Parameters:
+            name (str): the save's file name.
+
+        Returns:
+            (str): the path of the save.
+        """
+        return os.path.join(self._directory, name)
+
+    def sync(self):
+        """Brings the index up to date with the directory. Only saves that
+        are new or whose modification time or size has changed are read.
+
+        Returns:
+            (int): the number of saves read.
+        """
+        indexed = {name: (modified, size) for name, modified, size
+                   in self._db.execute("SELECT name, modified, size FROM saves")}
+        read = 0
+        with self._db:
+            for entry in os.scandir(self._directory):
+                if not entry.name.endswith((SAVE_EXTENSION, MAPPED_EXTENSION)) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if indexed.pop(entry.name, None) != (stat.st_mtime_ns, stat.st_size):
+                    if self.index_save(entry.name, stat):
+                        read += 1
+            self._db.executemany("DELETE FROM saves WHERE name = ?", [(name,) for name in indexed])
+        return read
+
+    def index_save(self, name, stat):
+        """Reads a save's details into the index. Files that are not valid
+        saves are left out.
+
+        Parameters:
+            name (str): the save's file name.
+            stat (os.stat_result): the save's file status.
+
+        Returns:
+            (bool): True if the save was indexed.
+        """
+        try:
+            board_model, time_elapsed = load_board(self.get_path(name), writable=False)
+        except (OSError, ValueError):
+            self._db.execute("DELETE FROM saves WHERE name = ?", (name,))
+            return False
+
+        row = (name, board_model.get_grid_size(), board_model.get_num_pokemon(),
+               summarise_board(board_model), time_elapsed, stat.st_mtime_ns, stat.st_size)
+        board_model.close()
+        self._db.execute("INSERT OR REPLACE INTO saves VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        return True
+
+    def save(self, name, board_model, time_elapsed):
+        """Saves a game to the library and indexes it.
+
+        Parameters:
+            name (str): the save's file name.
+            board_model (BoardModel): the game to save.
+            time_elapsed (int): the time elapsed in seconds.
+        """
+        file_name = self.get_path(name)
+        if name.endswith(MAPPED_EXTENSION):
+            write_mapped_save(file_name, board_model, time_elapsed)
+        else:
+            write_save(file_name, board_model, time_elapsed)
+        with self._db:
+            self.index_save(name, os.stat(file_name))
+
+    def list_saves(self, order_by="modified", descending=True, search="", grid_size=None):
+        """Lists the saves in the library from the index.
+
+        Parameters:
+            order_by (str): the column to sort by, one of LIBRARY_COLUMNS.
+            descending (bool): True to sort largest first.
+            search (str): only list saves whose name contains this text.
+            grid_size (int): only list saves of this grid size, or None for all.
+
+        Returns:
+            (list<tuple>): the values of LIBRARY_COLUMNS for each save.
+        """
+        if order_by not in LIBRARY_COLUMNS:
+            raise ValueError(f"Cannot sort saves by {order_by}")
+
+        query = f"SELECT {', '.join(LIBRARY_COLUMNS)} FROM saves WHERE name LIKE ? ESCAPE '\\'"
+        parameters = ["%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"]
+        if grid_size is not None:
+            query += " AND grid_size = ?"
+            parameters.append(grid_size)
+        query += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, name"
+        return self._db.execute(query, parameters).fetchall()
+
+    def close(self):
+        """Closes the index."""
+        self._db.close()
+
+class BoardGeometry(object):
+    """This class holds the integer pixel edges of every cell for a board
+    drawn at a given size. It is built once per canvas size, so drawing and
+    hit-testing only need lookups and integer arithmetic.
+    """
+    def __init__(self, grid_size, board_size):
+        """Constructs the geometry of a grid drawn at the given size.
+
+        Parameters:
+            grid_size (int): the number of cells in each row and column.
+            board_size (int): the width (and height) of the board in pixels.
+        """
+        self._grid_size = grid_size
+        self._board_size = board_size
+        self._edges = [i*board_size//grid_size for i in range(grid_size + 1)]
+
+    def get_board_size(self):
+        """Retrieves the width of the board.
+
+        Returns:
+            self._board_size (int): the board width in pixels.
+        """
+        return self._board_size
+
+    def cell_bbox(self, position):
+        """Calculates the bounding box of the cell at the given position.
+
+        Parameters:
+            position (tuple): the position of the cell (row, column).
+
+        Returns:
+            (x1, y1, x2, y2) (tuple): the bounding box.
+        """
+        row, col = position
+        edges = self._edges
+        return (edges[col], edges[row], edges[col + 1], edges[row + 1])
+
+    def cell_centre(self, position):
+        """Calculates the centre pixel of the cell at the given position.
+
+        Parameters:
+            position (tuple): the position of the cell (row, column).
+
+        Returns:
+            (x, y) (tuple): the centre pixel.
+        """
+        x1, y1, x2, y2 = self.cell_bbox(position)
+        return ((x1 + x2)//2, (y1 + y2)//2)
+
+    def pixel_to_position(self, pixel):
+        """Finds the cell containing the given pixel. Pixels outside the board
+        give a row or column outside the grid.
+
+        Parameters:
+            pixel (tuple): the pixel coordinates (x, y).
+
+        Returns:
+            (row, col) (tuple): the position of the cell.
+        """
+        x, y = pixel
+        row = bisect.bisect_right(self._edges, int(y)) - 1
+        col = bisect.bisect_right(self._edges, int(x)) - 1
+        return (row, col)
+
+class BoardView(tk.Canvas):
+    """This is the class that controls the GUI when task=TASK_ONE. This class is
+    responsible for updating the GUI and calculating the bounding box, center
+    pixel and the position of tiles. This class inherits from tk.Canvas.
+    """
+    render_table = COLOUR_TABLE #Cell byte -> (fill colour, text)
+
+    def __init__(self, master, grid_size, board_width=600, *args, **kwargs):
+        """Constructs a board view using the given grid size, board width,
+        args and kwargs for the master window.
+
+        Parameters:
+            master (str): the window in which to display the game (typically, root).
+            grid_size (int): the size of the game.
+            board_width (int): the board width.
+        """
+        super().__init__(master, width=board_width, height=board_width, borderwidth=0, highlightthickness=0, *args, **kwargs)
+        self._master = master
+        self._grid_size = grid_size
+        self._board_width = board_width
+
+        #Redraw scheduling
+        self._board = None
+        self._cell_items = {} #Index -> canvas items drawn for the cell
+        self._dirty = set()
+        self._full_redraw = False
+        self._redraw_job = None
+        self._last_flush = 0
+
+        self.update_geometry()
+        self.bind("<Configure>", self.resize)
+
+    def update_geometry(self):
+        """Rebuilds the cell geometry for the current board width."""
+        self._geometry = BoardGeometry(self._grid_size, self._board_width)
+
+    def set_grid_size(self, grid_size):
+        """Changes the number of cells in each row and column, such as when a
+        save of a different size is loaded. The board must be redrawn after.
+
+        Parameters:
+            grid_size (int): the new grid size.
+        """
+        self.cancel_redraw()
+        self._grid_size = grid_size
+        self.update_geometry()
+
+    def resize(self, e):
+        """Handles the canvas being resized by rebuilding the geometry and
+        redrawing the board to fit.
+
+        Parameters:
+            e (tuple): the configure event holding the new canvas size.
+        """
+        size = min(e.width, e.height)
+        if size <= 0 or size == self._board_width:
+            return
+
+        self._board_width = size
+        self.update_geometry()
+        if self._board is not None:
+            self.draw_board(self._board)
+
+    def draw_board(self, board):
+        """This function refreshes the board view and draws the game using the
+        specified board (game string).
+
+        Parameters:
+            board (str): the game string.
+        """
+        self.cancel_redraw()
+        self.delete("all")
+        self._board = board
+        self._cell_items = {}
+
+        for index in range(len(board)):
+            self.draw_cell(index, board[index])
+        self.pack(side=tk.TOP, anchor=tk.N, fill=tk.BOTH, expand=True)
+
+    def draw_cell(self, index, instance):
+        """This function redraws a single cell of the board.
+
+        Parameters:
+            index (int): the game string index of the cell.
+            instance (str): the character of the cell in the game string.
+        """
+        position = divmod(index, self._grid_size)
+        x1, y1, x2, y2 = self._geometry.cell_bbox(position)
+        colour, text = self.render_table[ord(instance)]
+
+        for item in self._cell_items.get(index, ()):
+            self.delete(item)
+
+        items = [self.create_rectangle(x1, y1, x2, y2, fill=colour)]
+        if text:
+            items.append(self.create_text(*self._geometry.cell_centre(position), text=text))
+        self._cell_items[index] = items
+
+    def schedule_redraw(self, board, changed=None):
+        """Marks the changed cells as dirty and schedules a single redraw for
+        the next frame. Any number of calls made before the frame is drawn
+        are merged into one canvas pass.
+
+        Parameters:
+            board (str): the game string.
+            changed (list<int>): the indexes of the changed cells, or None
+            to redraw the whole board.
+        """
+        self._board = board
+        if changed is None:
+            self._full_redraw = True
+        else:
+            self._dirty.update(changed)
+
+        if self._redraw_job is None:
+            wait = FRAME_TIME - int((time.monotonic() - self._last_flush)*1000)
+            if wait > 0:
+                self._redraw_job = self.after(wait, self.flush_redraw)
+            else:
+                self._redraw_job = self.after_idle(self.flush_redraw)
+
+    def flush_redraw(self):
+        """Draws every cell marked dirty since the last frame."""
+        self._redraw_job = None
+        self._last_flush = time.monotonic()
+        board = self._board
+
+        if self._full_redraw:
+            self.draw_board(board)
+            return
+
+        dirty = self._dirty
+        self._dirty = set()
+        for index in dirty:
+            self.draw_cell(index, board[index])
+
+    def show_hint(self, index, colour="blue"):
+        """Outlines a cell to suggest it to the player.
+
+        Parameters:
+            index (int): Game string index.
+            colour (str): the colour of the outline.
+        """
+        self.clear_hint()
+        position = (index//self._grid_size, index % self._grid_size)
+        self.create_rectangle(*self._geometry.cell_bbox(position), outline=colour, width=3, tags="hint")
+
+    def clear_hint(self):
+        """Removes the hint outline, if there is one."""
+        self.delete("hint")
+
+    def cancel_redraw(self):
+        """Cancels a scheduled redraw and forgets the dirty cells."""
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+        self._dirty = set()
+        self._full_redraw = False
+
+    def get_bbox(self, pixel):
+        """This function calculates the bounding box of tile at the specified
+        pixel coordinates. 
+
+        Parameters:
+            pixel (tuple): a tuple containing the pixel coordinates.
+
+        Returns:
+            (x1, y1, x2, y2) (tuple): a tuple containing the bounding box.
+        """
+        return self._geometry.cell_bbox(self._geometry.pixel_to_position(pixel))
+
+    def position_to_pixel(self, position):
+        """This function calculates the center pixel of the tile at the
+        given position.
+
+        Parameters:
+            position (tuple): a tuple containing the position of the tile (row, column).
+
+        Returns:
+            (x, y) (tuple): the center pixel of the specified tile.
+        """
+        return self._geometry.cell_centre(position)
+
+    def pixel_to_position(self, pixel):
+        """This function calculates the position of the tile at the given
+        pixel coordinates. The pixel is relative to the visible window, so
+        any scroll offset is added first.
+
+        Parameters:
+            pixel (tuple): a tuple containing the pixel coordinates.
+
+        Returns:
+            position (tuple): a tuple containing the position (row, column).
+        """
+        x, y = pixel
+        return self._geometry.pixel_to_position((self.canvasx(x), self.canvasy(y)))
+
+    def pixel_to_index(self, pixel):
+        """This function finds the game string index of the tile at the given
+        pixel coordinates.
+
+        Parameters:
+            pixel (tuple): a tuple containing the pixel coordinates.
+
+        Returns:
+            (int): the game string index, or None if the pixel is off the board.
+        """
+        row, col = self.pixel_to_position(pixel)
+        if 0 <= row < self._grid_size and 0 <= col < self._grid_size:
+            return row*self._grid_size + col
+
+
+class StatusBar(tk.Frame):
+    """This class is responsible for updating, modifying and drawing the status bar
     when task=TASK_TWO. This class inherits from tk.Frame.
     """
     def __init__(self, master, num_pokemon, game):
@@ -581,12 +2848,14 @@ class StatusBar(tk.Frame):
         self._master = master
         self._num_pokemon = num_pokemon
         self._game = game
-        self._time = -1
+        self._start = time.monotonic()
+        self._update_job = None
 
         #Image Referencing
+        load_pil()
         images_open = [
-            Image.open(r"images\clock.png"),
-            Image.open(r"images\empty_pokeball.png")
+            Image.open(os.path.join(IMAGE_DIR, "clock.png")),
+            Image.open(os.path.join(IMAGE_DIR, "empty_pokeball.png"))
             ]
         
         self._images = [
@@ -594,22 +2863,19 @@ class StatusBar(tk.Frame):
             ImageTk.PhotoImage(images_open[1])
             ]
 
-        #Defining Variable to display on Status Bar
-        num_catches = 0
-        for instance in game:
-            if instance == FLAG:
-                num_catches += 1
-
-        num_pokeballs_left = num_pokemon - num_catches
+        #Variables to display on Status Bar
+        self._catches_text = tk.StringVar(self)
+        self._pokeballs_text = tk.StringVar(self)
+        self._time_text = tk.StringVar(self)
 
         #Labels
         pokeball = tk.Label(self, image=self._images[1], borderwidth=0)
         pokeball.place(x=75, y=8)
         
-        attempted_catches = tk.Label(self, text=f"{num_catches} attempted catches", bg="white")
+        attempted_catches = tk.Label(self, textvariable=self._catches_text, bg="white")
         attempted_catches.place(x=130, y=15)
 
-        pokeballs_left = tk.Label(self, text=f"{num_pokeballs_left} pokeballs left", bg="white")
+        pokeballs_left = tk.Label(self, textvariable=self._pokeballs_text, bg="white")
         pokeballs_left.place(x=130, y=32)
         
         clock = tk.Label(self, image=self._images[0], borderwidth=0)
@@ -618,6 +2884,9 @@ class StatusBar(tk.Frame):
         time_elapsed_label = tk.Label(self, text="Time elapsed", bg="white")
         time_elapsed_label.place(x=310, y=15)
 
+        time_elapsed = tk.Label(self, textvariable=self._time_text, bg="white")
+        time_elapsed.place(x=325, y=32)
+
         #Buttons
         new_game = tk.Button(self, text="New game", command=self.new_game)
         new_game.place(x=450, y=8)
@@ -625,62 +2894,235 @@ class StatusBar(tk.Frame):
         restart_game = tk.Button(self, text="Restart game", command=self.restart_game)
         restart_game.place(x=443, y=37)
 
+        self.update_num_catches(game)
+        self.update()
+
+    def get_time(self):
+        """Retrieves the time elapsed in the game. The time is measured with
+        a monotonic clock so it does not drift when the timer ticks are late.
+
+        Returns:
+            (int): the number of whole seconds elapsed.
+        """
+        return int(time.monotonic() - self._start)
+
+    def set_time(self, seconds):
+        """Sets the time elapsed in the game (e.g. when loading a game or
+        restarting) and redraws the timer.
+
+        Parameters:
+            seconds (int): the number of seconds elapsed.
+        """
+        self._start = time.monotonic() - seconds
+        if self._update_job is not None:
+            self.after_cancel(self._update_job)
         self.update()
 
     def update(self):
-        """This function updates the status bar timer and redraws it.
-        This function is repeated every 1000ms to ensure the timer is
-        up do date every second.
+        """This function updates the status bar timer text. It is repeated
+        just after each whole second of elapsed time so the timer stays up
+        to date every second.
         """
-        self._time += 1
+        elapsed = time.monotonic() - self._start
+        minutes = int(elapsed)//60
+        seconds = int(elapsed)%60
+        self._time_text.set(f"{minutes}m {seconds}s")
 
-        minutes = self._time//60
-        seconds = self._time%60
-            
-        time_elapsed = tk.Label(self, text=f"{minutes}m {seconds}s", bg="white")
-        time_elapsed.place(x=325, y=32)
-            
-        self.after(1000, self.update)
+        next_second = 1000 - int((elapsed%1)*1000)
+        self._update_job = self.after(next_second, self.update)
+
+    def set_num_pokemon(self, num_pokemon):
+        """Changes the number of pokemon the pokeballs left are counted from.
+
+        Parameters:
+            num_pokemon (int): the number of pokemon in the game.
+        """
+        self._num_pokemon = num_pokemon
 
     def update_num_catches(self, game):
         """This function updates the number of attempted catches and pokeballs
-        left and redraws them into the status bar.
+        left shown in the status bar.
 
         Parameters:
             game (str): the game string.
         """
-        num_catches = 0
-        for instance in game:
-            if instance == FLAG:
-                num_catches += 1
-
+        num_catches = game.count(FLAG)
         num_pokeballs_left = self._num_pokemon - num_catches
         
-        attempted_catches = tk.Label(self, text=f"{num_catches} attempted catches", bg="white")
-        attempted_catches.place(x=130, y=15)
-
-        pokeballs_left = tk.Label(self, text=f"{num_pokeballs_left} pokeballs left", bg="white")
-        pokeballs_left.place(x=130, y=32)
+        self._catches_text.set(f"{num_catches} attempted catches")
+        self._pokeballs_text.set(f"{num_pokeballs_left} pokeballs left")
 
     def new_game(self):
-        """This function handles the event of a new game by closing the root
-        window and restarting main()        
+        """This function handles the event of a new game by resetting the
+        game in place.
         """
-        root.destroy()
-        main()
+        pokemongame.new_game()
 
     def restart_game(self):
         """This function handles restarting the game with the same pokemon
         locations.        
         """
-        self._time = -1
-        pokemongame.board_model._game = UNEXPOSED * pokemongame._grid_size**2
-        pokemongame.board_view.draw_board(pokemongame.board_model.get_game())        
+        pokemongame.restart_game()
+
+class TileCache(object):
+    """This class holds the board tile images pre-scaled to a set of
+    power-of-two sizes (mipmaps) below the size of the source images. The
+    sources are loaded once and the levels built in a background thread. The
+    tiles for a given cell size are resized from the nearest level, or from
+    the sources for cells larger than every level, and the tiles of the last
+    TILE_CACHE_SIZES cell sizes are kept for reuse.
+    """
+    def __init__(self, sizes=MIPMAP_SIZES, background=True):
+        """Constructs a tile cache and starts building the mipmap levels
+        in the background.
+
+        Parameters:
+            sizes (tuple<int>): the power-of-two tile sizes to pre-scale.
+            background (bool): whether to build the levels in a background
+            thread or only when they are first needed.
+        """
+        self._sizes = sorted(sizes)
+        self._sources = None #List of PIL images, loaded once
+        self._levels = {} #Mipmap size -> list of PIL images
+        self._images = OrderedDict() #Cell size -> list of PIL images
+        self._tiles = OrderedDict() #Cell size -> list of PhotoImages
+        self._tables = OrderedDict() #(cell size, PhotoImages) -> resolved TILE_TABLE
+        self._lock = threading.Lock()
+        load_pil()
+
+        if background:
+            self._builder = threading.Thread(target=self.build_levels, daemon=True)
+            self._builder.start()
+
+    def build_levels(self):
+        """Loads the source tile images and scales them to every mipmap size."""
+        for size in self._sizes:
+            self.get_level(size)
+
+    def get_level(self, size):
+        """Retrieves the tile images of a mipmap level, building the level if
+        the background thread has not reached it yet. The source images are
+        loaded the first time any level is needed. A level at least as large
+        as the sources would only be an upscale, so the sources are used.
+
+        Parameters:
+            size (int): the mipmap size, or None for the source images.
+
+        Returns:
+            (list<Image>): the tile images scaled to (size, size).
+        """
+        with self._lock:
+            if self._sources is None:
+                self._sources = [Image.open(os.path.join(IMAGE_DIR, name)).convert("RGBA")
+                                 for name in TILE_IMAGES]
+            if size is None or size >= min(min(source.size) for source in self._sources):
+                return self._sources
+            if size not in self._levels:
+                self._levels[size] = [source.resize((size, size), Image.LANCZOS)
+                                      for source in self._sources]
+            return self._levels[size]
+
+    def nearest_level(self, cell_size):
+        """Chooses the smallest mipmap size that is at least the cell size,
+        so that tiles are only ever scaled down.
+
+        Parameters:
+            cell_size (int): the width of a cell in pixels.
+
+        Returns:
+            (int): the mipmap size, or None if the cell is larger than every
+            level and is scaled from the source images.
+        """
+        for size in self._sizes:
+            if size >= cell_size:
+                return size
+        return None
+
+    def get_cached(self, cache, key, build):
+        """Looks up tiles in one of the caches, building them if they are
+        missing. Only the TILE_CACHE_SIZES most recently used entries are
+        kept, so resizing the window through many cell sizes does not keep
+        the tiles of every one.
+
+        Parameters:
+            cache (OrderedDict): the cache, least recently used first.
+            key (object): the cell size, or cell size and kind of tile.
+            build (callable): makes the tiles for a missing key.
+
+        Returns:
+            (list): the cached tiles.
+        """
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = build()
+            if len(cache) > TILE_CACHE_SIZES:
+                cache.popitem(last=False)
+        return cache[key]
+
+    def get_tiles(self, cell_size):
+        """Retrieves the tile set for the given cell size. Tiles are made
+        from the nearest mipmap level the first time a size is requested.
+
+        Parameters:
+            cell_size (int): the width of a cell in pixels.
+
+        Returns:
+            (list<PhotoImage>): the tiles, indexed as in TILE_IMAGES.
+        """
+        return self.get_cached(self._tiles, cell_size, lambda: [ImageTk.PhotoImage(image)
+                                                                for image in self.get_images(cell_size)])
+
+    def get_images(self, cell_size):
+        """Retrieves the tile images for the given cell size as PIL images,
+        for drawing without Tk.
+
+        Parameters:
+            cell_size (int): the width of a cell in pixels.
+
+        Returns:
+            (list<Image>): the tile images, indexed as in TILE_IMAGES.
+        """
+        return self.get_cached(self._images, cell_size, lambda: self.scale_level(cell_size))
+
+    def scale_level(self, cell_size):
+        """Resizes the tiles of the nearest mipmap level to the cell size.
+
+        Parameters:
+            cell_size (int): the width of a cell in pixels.
+
+        Returns:
+            (list<Image>): the tile images, indexed as in TILE_IMAGES.
+        """
+        images = []
+        for image in self.get_level(self.nearest_level(cell_size)):
+            if image.size != (cell_size, cell_size):
+                image = image.resize((cell_size, cell_size), Image.BILINEAR)
+            images.append(image)
+        return images
+
+    def get_render_table(self, cell_size, photo=True):
+        """Retrieves TILE_TABLE resolved to the tiles for the given cell size.
+        The table is built once per cell size.
+
+        Parameters:
+            cell_size (int): the width of a cell in pixels.
+            photo (bool): True for Tk PhotoImages, False for PIL images.
+
+        Returns:
+            (list<tuple>): the tile for each cell byte and sprite number.
+        """
+        tiles = self.get_tiles(cell_size) if photo else self.get_images(cell_size)
+        return self.get_cached(self._tables, (cell_size, photo),
+                               lambda: resolve_render_table(TILE_TABLE, tiles))
+
 
 class ImageBoardView(BoardView):
     """This class is responsible for drawing the game board when
     task=TASK_TWO. This includes drawing, modifying and updating the
-    board GUI. This class inherits from BoardView.
+    board GUI. The board can be zoomed in and out, in which case only the
+    cells inside the visible part of the canvas are drawn. This class
+    inherits from BoardView.
     """
     def __init__(self, master, grid_size, board_width=600):
         """Constructs a board GUI with the given grid size and board width
@@ -691,128 +3133,453 @@ class ImageBoardView(BoardView):
             grid_size (int): the size of the grid.
             board_width (int): the board width in pixels.
         """
-        super().__init__(master, grid_size)
+        self._zoom = DEFAULT_ZOOM
+        super().__init__(master, grid_size, board_width)
         self._master = master
         self._grid_size = grid_size
-        self._board_width = board_width       
+        self._board_width = board_width
+        self._visible = (0, 0, 0, 0)
+        self._sprites = {}
+        self._tile_cache = TileCache()
+
+        #Zoom and scroll bindings
+        self._master.bind("<plus>", self.zoom_in)
+        self._master.bind("<equal>", self.zoom_in)
+        self._master.bind("<minus>", self.zoom_out)
+        self.bind("<MouseWheel>", self.scroll)
+        self.bind("<Shift-MouseWheel>", self.scroll)
+        self.bind("<Control-MouseWheel>", self.scroll)
+        self.bind("<Button-4>", self.scroll)
+        self.bind("<Button-5>", self.scroll)
+        self.bind("<Shift-Button-4>", self.scroll)
+        self.bind("<Shift-Button-5>", self.scroll)
+        self.bind("<Control-Button-4>", self.zoom_in)
+        self.bind("<Control-Button-5>", self.zoom_out)
+
+    def set_sprites(self, sprites):
+        """Sets the sprite to draw for each pokemon location.
+
+        Parameters:
+            sprites (dict<int, int>): pokemon index -> sprite number.
+        """
+        self._sprites = sprites
+
+    def get_cell_size(self):
+        """Calculates the width of a cell at the current zoom level.
+
+        Returns:
+            (int): the cell width in pixels.
+        """
+        cell_size = int(self._board_width/self._grid_size*ZOOM_LEVELS[self._zoom])
+        return max(cell_size, 1)
+
+    def update_geometry(self):
+        """Rebuilds the cell geometry for the current board width and zoom
+        level. The cells are all the same size so the tiles fit exactly.
+        """
+        board_size = self.get_cell_size()*self._grid_size
+        self._geometry = BoardGeometry(self._grid_size, board_size)
+        self.config(scrollregion=(0, 0, board_size, board_size))
 
     def draw_board(self, board):
         """This functions draws the board GUI from the given board (game string).
+        Only the cells inside the visible part of the canvas are drawn.
 
         Parameters:
             board (str): the game string.        
         """
         #Variables
+        self.cancel_redraw()
+        self.delete("all")
+        self._board = board
+        self._cell_items = {}
         width = self._board_width
         grid_size = self._grid_size
-        game = board
-        
-        pixels_x = int(width/grid_size)
-        pixels_y = pixels_x
+        cell_size = self.get_cell_size()
         
         #Image Referencing
-        self._images = [
-            ImageTk.PhotoImage(Image.open(r"images\pokeball.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\unrevealed.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\charizard.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\cyndaquil.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\pikachu.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\psyduck.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\togepi.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\pokemon_sprites\umbreon.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\zero_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\one_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\two_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\three_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\four_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\five_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\six_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\seven_adjacent.png").resize((pixels_x, pixels_y))),
-            ImageTk.PhotoImage(Image.open(r"images\eight_adjacent.png").resize((pixels_x, pixels_y)))
-            ]
+        self._cell_images = self._tile_cache.get_render_table(cell_size)
+
+        #Visible cells
+        first_row, first_col = self.pixel_to_position((0, 0))
+        last_row, last_col = self.pixel_to_position((width, width))
+        first_row = max(first_row, 0)
+        first_col = max(first_col, 0)
+        last_row = min(last_row + 1, grid_size)
+        last_col = min(last_col + 1, grid_size)
+        self._visible = (first_row, last_row, first_col, last_col)
         
         #Logic
-        row_count = -1
-        index = 0
-        while row_count < grid_size - 1:
-            col_count = -1
-            row_count += 1
-            
-            while col_count < grid_size - 1:
-                    instance = game[index]
-                    index += 1
-                    col_count += 1
-                    
-                    x1, y1 = self.position_to_pixel((row_count, col_count))
-
-                    if instance == UNEXPOSED:
-                        self.create_image(x1, y1, image=self._images[1])
-
-                    elif instance == POKEMON:
-                        random_index = random.randint(2, 7)
-                        self.create_image(x1, y1, image=self._images[random_index])
-
-                    elif instance == FLAG:
-                        self.create_image(x1, y1, image=self._images[0])
-
-                    elif instance in NUMBERS:
-                        number_index = int(instance) + 8
-                        self.create_image(x1, y1, image=self._images[number_index])
+        for row_count in range(first_row, last_row):
+            for col_count in range(first_col, last_col):
+                index = row_count*grid_size + col_count
+                self.draw_cell(index, board[index])
                         
-        self.pack(side=tk.TOP, anchor=tk.N)    
-                    
-        
-    def get_bbox(self, pixel):
-        """This function calculates the bounding box of tile at the specified
-        pixel coordinates. 
+        self.pack(side=tk.TOP, anchor=tk.N, fill=tk.BOTH, expand=True)
+
+    def draw_cell(self, index, instance):
+        """This function redraws a single cell of the board. Cells outside the
+        visible part of the canvas are skipped, they are drawn when scrolled
+        into view.
 
         Parameters:
-            pixel (tuple): a tuple containing the pixel coordinates.
+            index (int): the game string index of the cell.
+            instance (str): the character of the cell in the game string.
+        """
+        row_count, col_count = divmod(index, self._grid_size)
+        first_row, last_row, first_col, last_col = self._visible
+        if not (first_row <= row_count < last_row and first_col <= col_count < last_col):
+            return
+
+        image = self._cell_images[ord(instance)][self._sprites.get(index, 0)]
+
+        if index in self._cell_items:
+            self.itemconfig(self._cell_items[index][0], image=image)
+        else:
+            x1, y1 = self.position_to_pixel((row_count, col_count))
+            self._cell_items[index] = [self.create_image(x1, y1, image=image)]
+
+    def set_zoom(self, zoom):
+        """Changes the zoom level and redraws the visible cells. The view is
+        kept centred on the same part of the board.
+
+        Parameters:
+            zoom (int): the index of the new zoom level in ZOOM_LEVELS.
+        """
+        zoom = min(max(zoom, 0), len(ZOOM_LEVELS) - 1)
+        if zoom == self._zoom:
+            return
+
+        old_size = self.get_board_size()
+        centre_x = (self.canvasx(0) + self._board_width/2)/old_size
+        centre_y = (self.canvasy(0) + self._board_width/2)/old_size
+
+        self._zoom = zoom
+        self.update_geometry()
+        new_size = self.get_board_size()
+        self.xview_moveto(centre_x - self._board_width/2/new_size)
+        self.yview_moveto(centre_y - self._board_width/2/new_size)
+
+        if self._board is not None:
+            self.draw_board(self._board)
+
+    def get_board_size(self):
+        """Calculates the width of the whole board at the current zoom level.
 
         Returns:
-            (x1, y1, x2, y2) (tuple): a tuple containing the bounding box.
+            (int): the board width in pixels.
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        x, y = pixel
-        x1 = (x//(width/grid_size))*(width/grid_size)
-        x2 = x1+(width/grid_size)
-        y1 = (y//(width/grid_size))*(width/grid_size)
-        y2 = y1+(width/grid_size)
-        return (x1, y1, x2, y2)
+        return self._geometry.get_board_size()
 
-    def position_to_pixel(self, position):
-        """This function calculates the center pixel of the tile at the
-        given position.
+    def zoom_in(self, e=None):
+        """Zooms in by one level.
 
         Parameters:
-            position (tuple): a tuple containing the position of the tile (row, column).
+            e (tuple): the event that triggered the zoom, if any.
+        """
+        self.set_zoom(self._zoom + 1)
 
-        Returns:
-            (x, y) (tuple): the center pixel of the specified tile.
+    def zoom_out(self, e=None):
+        """Zooms out by one level.
+
+        Parameters:
+            e (tuple): the event that triggered the zoom, if any.
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        row, col = position
-        x = (col*(width/grid_size))+(width/grid_size)/2
-        y = (row*(width/grid_size))+(width/grid_size)/2
-        return (x, y)
+        self.set_zoom(self._zoom - 1)
 
-    def pixel_to_position(self, pixel):
-        """This function calculates the position of the tile at the given
-        pixel coordinates.
+    def scroll(self, e):
+        """Scrolls the board with the mouse wheel (holding shift scrolls
+        sideways, holding control zooms) and redraws the visible cells.
 
         Parameters:
-            pixel (tuple): a tuple containing the pixel coordinates.
+            e (tuple): the mouse wheel event.
+        """
+        if getattr(e, "num", None) == 4 or getattr(e, "delta", 0) > 0:
+            step = -1
+        else:
+            step = 1
+
+        if e.state & 0x0004: #Control
+            self.set_zoom(self._zoom - step)
+            return
+
+        if e.state & 0x0001: #Shift
+            self.xview_scroll(step, "units")
+        else:
+            self.yview_scroll(step, "units")
+
+        if self._board is not None:
+            self.draw_board(self._board)
+
+class ReplayPlayer(tk.Frame):
+    """This class shows a replay with controls to play, pause and seek to
+    any click. This class inherits from tk.Frame.
+    """
+    def __init__(self, master, engine, speed=1.0):
+        """Constructs a replay player for the given engine in the specified
+        master window.
 
-        Returns:
-            position (tuple): a tuple containing the position (row, column).
+        Parameters:
+            master (str): the master window.
+            engine (ReplayEngine): the replay to show.
+            speed (float): the playback speed, 1 for the speed it was played at.
         """
-        width = self._board_width
-        grid_size = self._grid_size
-        x, y = pixel
-        position = (y//(width/grid_size)), (x//(width/grid_size))
-        return position
+        super().__init__(master)
+        self._master = master
+        self._engine = engine
+        self._speed = speed
+        self._play_job = None
+
+        board_model = engine.get_board_model()
+        controls = tk.Frame(self)
+        controls.pack(side=tk.BOTTOM, fill=tk.X)
+        self._play_text = tk.StringVar(self, "Play")
+        tk.Button(controls, textvariable=self._play_text, width=6, command=self.toggle_play).pack(side=tk.LEFT)
+        self._slider = tk.Scale(controls, from_=0, to=engine.get_num_moves(),
+                                orient=tk.HORIZONTAL, showvalue=True, command=self.slide)
+        self._slider.pack(side=tk.LEFT, fill=tk.X, expand=1)
+
+        self.board_view = ImageBoardView(self, board_model.get_grid_size())
+        self.board_view.set_sprites(board_model.get_sprites())
+        self.board_view.draw_board(board_model.get_cells())
+
+        self._master.bind("<space>", lambda e: self.toggle_play())
+        self._master.bind("<Left>", lambda e: self.seek(self._engine.get_move() - 1))
+        self._master.bind("<Right>", lambda e: self.seek(self._engine.get_move() + 1))
+        self._master.bind("<Home>", lambda e: self.seek(0))
+        self._master.bind("<End>", lambda e: self.seek(self._engine.get_num_moves()))
+
+    def toggle_play(self):
+        """Plays the replay if it is paused, or pauses it if it is playing."""
+        if self._play_job is None:
+            self.play()
+        else:
+            self.pause()
+
+    def play(self):
+        """Plays the replay from the current move, restarting it if it has
+        finished.
+        """
+        if self._engine.get_move() == self._engine.get_num_moves():
+            self.seek(0)
+        self._play_text.set("Pause")
+        self._play_job = self.after(0, self.play_move)
+
+    def pause(self):
+        """Pauses the replay."""
+        if self._play_job is not None:
+            self.after_cancel(self._play_job)
+            self._play_job = None
+        self._play_text.set("Play")
+
+    def play_move(self):
+        """Replays the next move and schedules the one after it, with the
+        same gap between them as when the game was played.
+        """
+        move = self._engine.get_move()
+        if move >= self._engine.get_num_moves():
+            self.pause()
+            return
+
+        self.show(self._engine.step())
+        if move + 1 >= self._engine.get_num_moves():
+            self.pause()
+            return
+
+        delay = (self._engine.get_time(move + 1) - self._engine.get_time(move))/self._speed
+        self._play_job = self.after(int(min(delay, REPLAY_MAX_DELAY)), self.play_move)
+
+    def slide(self, value):
+        """Seeks to the move chosen with the slider.
+
+        Parameters:
+            value (str): the slider position.
+        """
+        if int(value) != self._engine.get_move():
+            self.seek(int(value))
+
+    def seek(self, move):
+        """Shows the game after the given number of moves.
+
+        Parameters:
+            move (int): the number of moves.
+        """
+        self._engine.seek(move)
+        self.show(None)
+
+    def show(self, changed):
+        """Redraws the board and moves the slider to the current move.
+
+        Parameters:
+            changed (list<int>): the indexes of the changed cells, or None if
+            the whole board may have changed.
+        """
+        self.board_view.schedule_redraw(self._engine.get_board_model().get_cells(), changed)
+        self._slider.set(self._engine.get_move())
+
+class LibraryWindow(tk.Toplevel):
+    """This class shows the saves in a SaveLibrary in a table that can be
+    sorted by clicking a column heading and filtered by name. Double
+    clicking a save loads it. The window is hidden rather than destroyed
+    when closed. This class inherits from tk.Toplevel.
+    """
+    def __init__(self, master, library, load):
+        """Constructs a library window for the given library.
+
+        Parameters:
+            master (str): the master window.
+            library (SaveLibrary): the save library to show.
+            load (callable): called with the file of a save to load it.
+        """
+        from tkinter import ttk
+
+        super().__init__(master)
+        self.title("Save library")
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+        self._library = library
+        self._load = load
+        self._order_by = "modified"
+        self._descending = True
+
+        self._search_text = tk.StringVar(self)
+        self._search_text.trace_add("write", lambda *args: self.refresh())
+        search = tk.Frame(self)
+        search.pack(side=tk.TOP, fill=tk.X)
+        tk.Label(search, text="Search:").pack(side=tk.LEFT)
+        tk.Entry(search, textvariable=self._search_text).pack(side=tk.LEFT, fill=tk.X, expand=1)
+
+        self._table = ttk.Treeview(self, columns=LIBRARY_COLUMNS, show="headings", height=15)
+        for column in LIBRARY_COLUMNS:
+            self._table.heading(column, text=column.replace("_", " ").capitalize(),
+                                command=lambda column=column: self.sort(column))
+            self._table.column(column, width=200 if column in ("name", "modified") else 90)
+        self._table.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._table.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._table.config(yscrollcommand=scrollbar.set)
+        self._table.bind("<Double-1>", self.open_save)
+        self.refresh()
+
+    def sort(self, column):
+        """Sorts the table by a column, reversing the order if it is already
+        sorted by it.
+
+        Parameters:
+            column (str): one of LIBRARY_COLUMNS.
+        """
+        if column == self._order_by:
+            self._descending = not self._descending
+        else:
+            self._order_by, self._descending = column, False
+        self.refresh()
+
+    def refresh(self):
+        """Fills the table from the library index."""
+        self._table.delete(*self._table.get_children())
+        for name, grid_size, num_pokemon, progress, time_elapsed, modified in self._library.list_saves(
+                self._order_by, self._descending, self._search_text.get()):
+            self._table.insert("", tk.END, iid=name, values=(
+                name, grid_size, num_pokemon, f"{progress:.0%}", time_elapsed,
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(modified/1e9))))
+
+    def open_save(self, e):
+        """Loads the double clicked save.
+
+        Parameters:
+            e (tk.Event): the double click.
+        """
+        name = self._table.identify_row(e.y)
+        if name:
+            self._load(self._library.get_path(name))
+
+class FileWorker(object):
+    """Runs save and load jobs one at a time on a background thread, so file
+    I/O and parsing never stall the window. Progress and results come back
+    through a queue that is polled from the Tk event loop, and each job's
+    callback runs on the main thread.
+    """
+    def __init__(self, master, on_progress):
+        """Constructs a file worker. The thread is started with the first job.
+
+        Parameters:
+            master (str): the window whose event loop polls for results.
+            on_progress (callable): called with a label and fraction done as a
+            job progresses, and with (None, 1) once there are no jobs left.
+        """
+        self._master = master
+        self._on_progress = on_progress
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._callbacks = {} #Job number -> callbacks for the result and error
+        self._next_job = 0
+        self._thread = None
+        self._poll_job = None
+
+    def submit(self, label, function, args, on_done, on_error=None):
+        """Queues a job. The function is called on the worker thread with the
+        arguments and a progress keyword argument.
+
+        Parameters:
+            label (str): what the job does, shown with its progress.
+            function (callable): the job.
+            args (tuple): the arguments for the function.
+            on_done (callable): called on the main thread with the result.
+            on_error (callable): called on the main thread with the error if
+            the job fails, before it is shown, or None.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+        self._callbacks[self._next_job] = on_done, on_error
+        self._jobs.put((self._next_job, label, function, args))
+        self._next_job += 1
+        self._on_progress(label, 0)
+        if self._poll_job is None:
+            self._poll_job = self._master.after(WORKER_POLL, self.poll)
+
+    def run(self):
+        """Runs queued jobs on the worker thread. The result, or the error
+        that stopped the job, is passed back through the results queue.
+        """
+        while True:
+            job, label, function, args = self._jobs.get()
+
+            def progress(done, total, label=label):
+                self._results.put(("progress", label, done/total if total else 1))
+
+            try:
+                self._results.put(("done", job, function(*args, progress=progress)))
+            except Exception as error:
+                self._results.put(("error", job, error))
+
+    def poll(self):
+        """Handles the messages from the worker thread on the main thread and
+        keeps polling while jobs are outstanding.
+        """
+        self._poll_job = None
+        while True:
+            try:
+                kind, first, second = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                self._on_progress(first, second)
+                continue
+            on_done, on_error = self._callbacks.pop(first)
+            if not self._callbacks:
+                self._on_progress(None, 1)
+            if kind == "done":
+                on_done(second)
+            else:
+                if on_error is not None:
+                    on_error(second)
+                from tkinter.messagebox import showerror
+                showerror("File error", str(second), parent=self._master)
+
+        if self._callbacks:
+            self._poll_job = self._master.after(WORKER_POLL, self.poll)
 
 class FileMenu(object):
     """This class is responsible for the file menu which holds the options
@@ -825,6 +3592,8 @@ class FileMenu(object):
             master (str): the master window (typically root).
         """
         self._master = master
+        self._library = None #SaveLibrary, opened on first use
+        self._library_window = None
 
         menubar = tk.Menu(self._master)
         self._master.config(menu=menubar)
@@ -834,6 +3603,9 @@ class FileMenu(object):
         
         filemenu.add_command(label="Save game", command=self.save_game)
         filemenu.add_command(label="Load game", command=self.load_game)
+        filemenu.add_command(label="Save replay", command=self.save_replay)
+        filemenu.add_command(label="Save to library", command=self.save_to_library)
+        filemenu.add_command(label="Open library", command=self.open_library)
         filemenu.add_command(label="Restart game", command=self.restart_game)
         filemenu.add_command(label="New game", command=self.new_game)
         filemenu.add_command(label="Quit", command=self.quit)
@@ -842,66 +3614,1112 @@ class FileMenu(object):
         """This function controls saving the game to the specified directory
         and file name using the asksaveasfilename commmand.
         """
-        save_data = []
-        save_data.append(pokemongame.board_model.get_game())
-        save_data.append(str(pokemongame.board_model.get_pokemon_locations()))
-        save_data.append(str(pokemongame.status_bar._time))
+        from tkinter.filedialog import asksaveasfilename
 
-        save_file = (asksaveasfilename(defaultextension=".txt",
-                                      filetypes=[("All files", "*.*")],
-                                      initialfile="save_file.txt"))
+        save_file = (asksaveasfilename(defaultextension=SAVE_EXTENSION,
+                                      filetypes=[("Saved games", "*" + SAVE_EXTENSION),
+                                                 ("Mapped saves for large boards", "*" + MAPPED_EXTENSION),
+                                                 ("All files", "*.*")],
+                                      initialfile="save_file" + SAVE_EXTENSION))
         if save_file != "":
-            file = open(save_file, mode="w")
-            file.write(str(save_data))
+            self.write_in_background(save_file)
+
+    def write_in_background(self, save_file, on_done=None):
+        """Saves a snapshot of the game on the file worker thread, in the
+        mapped format if the file has the mapped save extension.
+
+        Parameters:
+            save_file (str): the file to write.
+            on_done (callable): called with no arguments once it is saved.
+        """
+        board_model = pokemongame.board_model
+        mapped_file = board_model.get_storage_file()
+        if (save_file.endswith(MAPPED_EXTENSION) and mapped_file is not None
+                and os.path.exists(save_file) and os.path.samefile(save_file, mapped_file)):
+            #The game is played from this file, so only its header is stale
+            board_model.flush()
+            write = update_mapped_save
+        else:
+            write = write_mapped_save if save_file.endswith(MAPPED_EXTENSION) else write_save
+            board_model = board_model.snapshot()
+        pokemongame.get_worker().submit("Saving", write, (save_file, board_model, pokemongame.status_bar.get_time()),
+                                        lambda result: on_done and on_done())
 
     def load_game(self):
         """This function controls loading the game from the specified directory
         and file name using the askopenfilename commmand.
         """
+        from tkinter.filedialog import askopenfilename
+
         file_dir = askopenfilename()
         if file_dir != "":
-            load_data = open(file_dir, "r")
-            data = load_data.read()
-            data_split = data.split("', '")
+            self.load_file(file_dir)
 
-            game_string = data_split[0][2::]
-            pokemon_locations_raw = data_split[1][1:-1].split(", ")
-            pokemongame.status_bar._time = int(data_split[2][0:-2])
-            
-            pokemon_locations = ()
-            for instance in pokemon_locations_raw:
-                pokemon_locations += (int(instance),)
+    def load_file(self, file_dir):
+        """Loads a saved game on the file worker thread and swaps it into the
+        window once it has been read.
+
+        Parameters:
+            file_dir (str): the save file.
+        """
+        pokemongame.get_worker().submit("Loading", load_board, (file_dir,),
+                                        lambda result: pokemongame.replace_board(*result))
+
+    def save_to_library(self):
+        """Saves the game to the save library under a name chosen by the user."""
+        from tkinter.simpledialog import askstring
+
+        name = askstring("Save to library", "Save name:", parent=self._master)
+        if name:
+            if not name.endswith((SAVE_EXTENSION, MAPPED_EXTENSION)):
+                name += SAVE_EXTENSION
+            self.write_in_background(self.get_library().get_path(name), self.library_saved)
+
+    def library_saved(self):
+        """Indexes a save written to the library by the file worker."""
+        self.get_library().sync()
+        if self._library_window is not None:
+            self._library_window.refresh()
+
+    def open_library(self):
+        """Shows the save library window, creating it the first time."""
+        if self._library_window is None:
+            self._library_window = LibraryWindow(self._master, self.get_library(), self.load_file)
+        else:
+            self.get_library().sync()
+            self._library_window.refresh()
+            self._library_window.deiconify()
+        self._library_window.lift()
+
+    def get_library(self):
+        """Retrieves the save library, opening it on first use.
+
+        Returns:
+            self._library (SaveLibrary): the save library.
+        """
+        if self._library is None:
+            self._library = SaveLibrary()
+        return self._library
 
-            pokemongame.board_model._pokemon_locations = pokemon_locations
-            pokemongame.board_model._game = game_string        
+    def save_replay(self):
+        """Saves the moves of the current game as a replay file, which can be
+        watched with python a3.py replay <file>.
+        """
+        from tkinter.filedialog import asksaveasfilename
 
-            pokemongame.board_view.draw_board(pokemongame.board_model.get_game())
-            pokemongame.check_game_state()
+        replay_file = asksaveasfilename(defaultextension=REPLAY_EXTENSION,
+                                        filetypes=[("Replays", "*" + REPLAY_EXTENSION),
+                                                   ("All files", "*.*")],
+                                        initialfile="replay" + REPLAY_EXTENSION)
+        if replay_file != "":
+            pokemongame.replay.save(replay_file)
 
     def restart_game(self):
         """This function handles restarting the game with the same pokemon
         locations.        
         """
-        pokemongame.status_bar._time = -1
-        pokemongame.board_model._game = UNEXPOSED * pokemongame._grid_size**2
-        pokemongame.board_view.draw_board(pokemongame.board_model.get_game())
+        pokemongame.restart_game()
 
     def new_game(self):
-        """This function handles the event of a new game by closing the root
-        window and restarting main()        
+        """This function handles the event of a new game by resetting the
+        game in place.
         """
-        root.destroy()
-        main()
+        pokemongame.new_game()
     
     def quit(self):
         """This function, when called, quits the game.
         """
-        exit()
+        pokemongame.exit()
+
+#A legacy text save is str([game, str(locations), str(time)])
+_LEGACY_SAVE = re.compile(r"\['([0-8~FP]+)', '\(((?:[0-9]{1,10}(?:, [0-9]{1,10})*,?)?)\)', '([0-9]{1,10})'\]\s*")
+
+def parse_save(data):
+    """Reads and validates the contents of a legacy text save file, as
+    written by str([game, str(locations), str(time)]). The whole file is
+    matched in one pass and then every location is checked against the
+    grid size, so a malformed or inconsistent file raises ValueError rather
+    than loading a corrupted game.
+
+    Parameters:
+        data (str): the contents of the save file.
+
+    Returns:
+        (tuple): the game string, the pokemon locations (tuple<int>) and the
+        time elapsed in seconds (int).
+    """
+    match = _LEGACY_SAVE.fullmatch(data)
+    if match is None:
+        raise ValueError("Save file is not a valid legacy save")
+    game_string, locations_text, time_text = match.groups()
+
+    cells = len(game_string)
+    if math.isqrt(cells)**2 != cells:
+        raise ValueError("Save file game is not a square grid")
+
+    pokemon_locations = tuple(int(token) for token in locations_text.split(",") if token)
+    pokemon_set = set(pokemon_locations)
+    if len(pokemon_set) != len(pokemon_locations):
+        raise ValueError("Save file has a pokemon location more than once")
+    if pokemon_locations and not 0 <= min(pokemon_locations) <= max(pokemon_locations) < cells:
+        raise ValueError("Save file has a pokemon location outside the grid")
+    if game_string.count(FLAG) > len(pokemon_locations):
+        raise ValueError("Save file has more flags than pokemon")
+    time_elapsed = int(time_text)
+    if time_elapsed > 0xFFFFFFFF: #Saves store the time as 32 bits
+        raise ValueError("Save file time is too large")
+
+    index = game_string.find(POKEMON)
+    while index != -1:
+        if index not in pokemon_set:
+            raise ValueError("Save file shows a pokemon where there is none")
+        index = game_string.find(POKEMON, index + 1)
+
+    return game_string, pokemon_locations, time_elapsed
+
+#Translation tables between cell characters and their 4 bit codes, and for
+#splitting a packed byte into its high and low cells
+_CELL_ENCODE = bytes.maketrans(CELL_CODES.encode(), bytes(range(len(CELL_CODES))))
+_CELL_DECODE = bytes.maketrans(bytes(range(len(CELL_CODES))), CELL_CODES.encode())
+_HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+_LOW_NIBBLE = bytes(value & 0xF for value in range(256))
+_TO_HIGH_NIBBLE = bytes((value << 4) & 0xFF for value in range(256))
+
+def pack_cells(game):
+    """Packs a game string into 4 bits per cell.
+
+    Parameters:
+        game (str): the game string.
+
+    Returns:
+        (bytes): two cells per byte, the first in the high bits.
+    """
+    codes = game.encode().translate(_CELL_ENCODE)
+    if len(codes) % 2:
+        codes += b"\0"
+    high = codes[0::2].translate(_TO_HIGH_NIBBLE)
+    low = codes[1::2]
+    #The nibbles do not overlap, so or-ing the bytes as one big integer packs them all at once
+    return (int.from_bytes(high, "big") | int.from_bytes(low, "big")).to_bytes(len(low), "big")
+
+def unpack_cells(packed, cells):
+    """Unpacks the cells written by pack_cells.
+
+    Parameters:
+        packed (bytes): the packed cells.
+        cells (int): the number of cells in the game.
+
+    Returns:
+        (str): the game string.
+    """
+    codes = bytearray(len(packed)*2)
+    codes[0::2] = packed.translate(_HIGH_NIBBLE)
+    codes[1::2] = packed.translate(_LOW_NIBBLE)
+    del codes[cells:]
+    if max(codes, default=0) >= len(CELL_CODES):
+        raise ValueError("Save file has an unknown cell state")
+    return codes.translate(_CELL_DECODE).decode()
+
+_RUNS = re.compile(rb"(.)\1*", re.DOTALL)
+
+def encode_runs(game):
+    """Run-length encodes a game string. Each run is a byte holding the 4 bit
+    cell code and the run length less one, up to 15; longer runs store 15
+    and follow it with the rest of the length as a varint.
+
+    Parameters:
+        game (str): the game string.
+
+    Returns:
+        (bytes): the runs.
+    """
+    runs = bytearray()
+    for match in _RUNS.finditer(game.encode().translate(_CELL_ENCODE)):
+        code = match.group()[0] << 4
+        length = match.end() - match.start() - 1
+        if length < 15:
+            runs.append(code | length)
+            continue
+
+        runs.append(code | 15)
+        length -= 15
+        while length >= 0x80:
+            runs.append(length & 0x7F | 0x80)
+            length >>= 7
+        runs.append(length)
+    return bytes(runs)
+
+def decode_runs(runs, cells):
+    """Decodes the runs written by encode_runs.
+
+    Parameters:
+        runs (bytes): the runs.
+        cells (int): the number of cells in the game.
+
+    Returns:
+        (str): the game string.
+    """
+    codes = []
+    position = 0
+    while position < len(runs):
+        code, length = runs[position] >> 4, runs[position] & 0xF
+        position += 1
+        if length == 15:
+            extra = shift = 0
+            while True:
+                if position >= len(runs):
+                    raise ValueError("Save file cell runs are truncated")
+                byte = runs[position]
+                position += 1
+                extra |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+            length += extra
+        if code >= len(CELL_CODES):
+            raise ValueError("Save file has an unknown cell state")
+        codes.append(bytes((code,))*(length + 1))
+
+    codes = b"".join(codes)
+    if len(codes) != cells:
+        raise ValueError("Save file cell runs do not match the grid size")
+    return codes.translate(_CELL_DECODE).decode()
+
+def compress(data, compression):
+    """Compresses data with one of the snapshot codec's compressors.
+
+    Parameters:
+        data (bytes): the data.
+        compression (int): COMPRESS_NONE, COMPRESS_ZLIB or COMPRESS_LZMA.
+
+    Returns:
+        (bytes): the compressed data.
+    """
+    if compression == COMPRESS_ZLIB:
+        return zlib.compress(data, 9)
+    if compression == COMPRESS_LZMA:
+        import lzma
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2}])
+    return data
+
+def decompress(data, compression):
+    """Decompresses data written by compress.
+
+    Parameters:
+        data (bytes): the compressed data.
+        compression (int): COMPRESS_NONE, COMPRESS_ZLIB or COMPRESS_LZMA.
+
+    Returns:
+        (bytes): the data.
+    """
+    if compression == COMPRESS_NONE:
+        return bytes(data)
+    try:
+        if compression == COMPRESS_ZLIB:
+            return zlib.decompress(data)
+        if compression == COMPRESS_LZMA:
+            import lzma
+            return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2}])
+    except Exception as error:
+        raise ValueError(f"Save file cannot be decompressed: {error}")
+    raise ValueError("Save file has an unknown compression")
+
+def encode_snapshot(game, locations):
+    """Encodes the cells and pokemon locations of a game with whichever of
+    the snapshot codecs gives the smallest result: cells packed or run-length
+    encoded, locations as varint gaps or a bitmap, and then optionally
+    compressed with zlib or lzma.
+
+    Parameters:
+        game (str): the game string.
+        locations (tuple<int>): the pokemon indexes.
+
+    Returns:
+        (tuple): the location format, cell format, compression, length of the
+        uncompressed cells and the encoded snapshot (bytes).
+    """
+    location_format, location_data = encode_locations(locations, len(game))
+    packed = pack_cells(game)
+    runs = encode_runs(game)
+    cell_format, cell_data = (CELLS_RLE, runs) if len(runs) < len(packed) else (CELLS_PACKED, packed)
+
+    body = cell_data + location_data
+    best = (COMPRESS_NONE, body)
+    for compression in (COMPRESS_ZLIB, COMPRESS_LZMA):
+        compressed = compress(body, compression)
+        if len(compressed) < len(best[1]):
+            best = (compression, compressed)
+    return (location_format, cell_format, best[0], len(cell_data), best[1])
+
+def decode_snapshot(location_format, cell_format, compression, cell_length, data, count, cells):
+    """Decodes a snapshot written by encode_snapshot.
+
+    Parameters:
+        location_format (int): LOCATIONS_DELTAS or LOCATIONS_BITMAP.
+        cell_format (int): CELLS_PACKED or CELLS_RLE.
+        compression (int): COMPRESS_NONE, COMPRESS_ZLIB or COMPRESS_LZMA.
+        cell_length (int): the length of the uncompressed cells.
+        data (bytes): the encoded snapshot.
+        count (int): the number of pokemon.
+        cells (int): the number of cells in the game.
+
+    Returns:
+        (tuple): the game string and the pokemon locations (tuple<int>).
+    """
+    body = decompress(data, compression)
+    if cell_length > len(body):
+        raise ValueError("Save file is truncated")
+
+    if cell_format == CELLS_PACKED:
+        if cell_length != (cells + 1)//2:
+            raise ValueError("Save file cells do not match the grid size")
+        game = unpack_cells(body[:cell_length], cells)
+    elif cell_format == CELLS_RLE:
+        game = decode_runs(body[:cell_length], cells)
+    else:
+        raise ValueError("Save file has an unknown cell format")
+    return game, decode_locations(location_format, body[cell_length:], count, cells)
+
+def encode_locations(locations, cells):
+    """Encodes pokemon locations as either varint deltas or a bitmap,
+    whichever is smaller.
+
+    Parameters:
+        locations (tuple<int>): the pokemon indexes.
+        cells (int): the number of cells in the game.
+
+    Returns:
+        (tuple): the format (LOCATIONS_DELTAS or LOCATIONS_BITMAP) and the data (bytes).
+    """
+    deltas = bytearray()
+    previous = 0
+    for index in sorted(locations):
+        gap = index - previous
+        previous = index
+        while gap >= 0x80:
+            deltas.append(gap & 0x7F | 0x80)
+            gap >>= 7
+        deltas.append(gap)
+
+    bitmap_size = (cells + 7)//8
+    if len(deltas) <= bitmap_size:
+        return LOCATIONS_DELTAS, bytes(deltas)
+    bitmap = bytearray(bitmap_size)
+    for index in locations:
+        bitmap[index >> 3] |= 1 << (index & 7)
+    return LOCATIONS_BITMAP, bytes(bitmap)
+
+def decode_locations(location_format, data, count, cells):
+    """Decodes the pokemon locations written by encode_locations.
+
+    Parameters:
+        location_format (int): LOCATIONS_DELTAS or LOCATIONS_BITMAP.
+        data (bytes): the encoded locations.
+        count (int): the number of pokemon.
+        cells (int): the number of cells in the game.
+
+    Returns:
+        (tuple<int>): the pokemon indexes in ascending order.
+    """
+    locations = []
+    if location_format == LOCATIONS_DELTAS:
+        index = gap = shift = 0
+        for byte in data:
+            gap |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                index += gap
+                locations.append(index)
+                gap = shift = 0
+    elif location_format == LOCATIONS_BITMAP:
+        for offset, byte in enumerate(data):
+            if byte:
+                base = offset << 3
+                locations.extend(base + bit for bit in BYTE_BITS[byte])
+    else:
+        raise ValueError("Save file has an unknown location format")
+
+    if len(locations) != count or (locations and locations[-1] >= cells):
+        raise ValueError("Save file pokemon locations do not match the header")
+    return tuple(locations)
+
+def encode_save(board_model, time_elapsed):
+    """Serialises a game to the binary save format.
+
+    Parameters:
+        board_model (BoardModel): the game to save.
+        time_elapsed (int): the time elapsed in seconds.
+
+    Returns:
+        (bytes): the save file contents.
+    """
+    locations = board_model.get_pokemon_locations()
+    location_format, cell_format, compression, cell_length, snapshot = encode_snapshot(
+        board_model.get_game(), locations)
+
+    header = SAVE_HEADERS[SAVE_VERSION].pack(SAVE_MAGIC, SAVE_VERSION, location_format, cell_format,
+                                             compression, board_model.get_grid_size(), len(locations),
+                                             board_model.get_seed(), time_elapsed, cell_length)
+    data = header + snapshot
+    return data + SAVE_CHECKSUM.pack(zlib.crc32(data))
+
+def decode_save(data):
+    """Reads a binary save file of any version, checking its header and
+    checksum.
+
+    Parameters:
+        data (bytes): the save file contents.
+
+    Returns:
+        (tuple): the game string, the pokemon locations (tuple<int>), the
+        time elapsed in seconds (int) and the board seed (int).
+    """
+    data = memoryview(data)
+    if len(data) < SAVE_PREFIX.size:
+        raise ValueError("Save file is truncated")
+    magic, version = SAVE_PREFIX.unpack_from(data)
+    if magic != SAVE_MAGIC:
+        raise ValueError("Not a binary save file")
+    if version not in SAVE_HEADERS:
+        raise ValueError(f"Unsupported save file version {version}")
+
+    header = SAVE_HEADERS[version]
+    if len(data) < header.size + SAVE_CHECKSUM.size:
+        raise ValueError("Save file is truncated")
+    body_end = len(data) - SAVE_CHECKSUM.size
+    if SAVE_CHECKSUM.unpack_from(data, body_end)[0] != zlib.crc32(data[:body_end]):
+        raise ValueError("Save file checksum does not match")
+
+    if version == 1: #Packed cells and no compression
+        _, _, location_format, grid_size, count, seed, time_elapsed = header.unpack_from(data)
+        cell_format, compression = CELLS_PACKED, COMPRESS_NONE
+        cell_length = (grid_size*grid_size + 1)//2
+    else:
+        (_, _, location_format, cell_format, compression, grid_size, count,
+         seed, time_elapsed, cell_length) = header.unpack_from(data)
+
+    game, locations = decode_snapshot(location_format, cell_format, compression, cell_length,
+                                      data[header.size:body_end], count, grid_size*grid_size)
+    return game, locations, time_elapsed, seed
+
+def write_chunks(save_file, data, progress=None):
+    """Writes data to a file IO_CHUNK bytes at a time, reporting progress
+    after each chunk.
+
+    Parameters:
+        save_file (file): the open file.
+        data (bytes): the data to write.
+        progress (callable): called with the bytes written and total, or None.
+    """
+    view = memoryview(data)
+    for start in range(0, len(view), IO_CHUNK):
+        save_file.write(view[start:start + IO_CHUNK])
+        if progress is not None:
+            progress(min(start + IO_CHUNK, len(view)), len(view))
+
+def write_save(file_name, board_model, time_elapsed, progress=None):
+    """Writes a game to a binary save file.
+
+    Parameters:
+        file_name (str): the file to write.
+        board_model (BoardModel): the game to save.
+        time_elapsed (int): the time elapsed in seconds.
+        progress (callable): called with the bytes written and total, or None.
+    """
+    with open(file_name, "wb") as save_file:
+        write_chunks(save_file, encode_save(board_model, time_elapsed), progress)
+
+def read_save(file_name, progress=None):
+    """Reads a binary save file with a single readinto, falling back to the
+    legacy text format for older saves. With a progress callback the file
+    is read IO_CHUNK bytes at a time instead.
+
+    Parameters:
+        file_name (str): the file to read.
+        progress (callable): called with the bytes read and total, or None.
+
+    Returns:
+        (tuple): the game string, the pokemon locations (tuple<int>), the
+        time elapsed in seconds (int) and the board seed (int, or None for
+        legacy saves).
+    """
+    with open(file_name, "rb") as save_file:
+        data = bytearray(os.fstat(save_file.fileno()).st_size)
+        if progress is None:
+            save_file.readinto(data)
+        else:
+            view = memoryview(data)
+            for start in range(0, len(view), IO_CHUNK):
+                save_file.readinto(view[start:start + IO_CHUNK])
+                progress(min(start + IO_CHUNK, len(view)), len(view))
+
+    if data[:len(SAVE_MAGIC)] == SAVE_MAGIC:
+        return decode_save(data)
+    if data[:len(MAPPED_MAGIC)] == MAPPED_MAGIC:
+        board_model, time_elapsed = open_mapped_save(file_name, writable=False)
+        game = board_model.get_game()
+        board_model.close()
+        return game, board_model.get_pokemon_locations(), time_elapsed, board_model.get_seed()
+    return parse_save(data.decode()) + (None,)
+
+def summarise_board(board_model):
+    """Calculates the fraction of the safe cells of a game that have been
+    uncovered.
+
+    Parameters:
+        board_model (BoardModel): the game.
+
+    Returns:
+        (float): the progress, from 0 to 1.
+    """
+    cells = board_model.get_grid_size()**2
+    safe = cells - board_model.get_num_pokemon()
+    covered = board_model.count_cells(UNEXPOSED) + board_model.count_cells(FLAG)
+    uncovered = cells - covered - board_model.count_cells(POKEMON)
+    return uncovered/safe if safe else 1.0
+
+def write_mapped_save(file_name, board_model, time_elapsed, progress=None):
+    """Writes a game to a mapped save file: a header padded to
+    MAPPED_ALIGNMENT bytes, one ASCII byte per cell, then the pokemon
+    locations as 32 bit integers. The file is written to a temporary file
+    first and then put in place, so a failed save leaves the old file whole.
+    A game being played from the file is saved with update_mapped_save
+    instead, as Windows cannot replace a file while it is mapped.
+
+    Parameters:
+        file_name (str): the file to write.
+        board_model (BoardModel): the game to save.
+        time_elapsed (int): the time elapsed in seconds.
+        progress (callable): called with the cells written and total, or None.
+    """
+    locations = board_model.get_pokemon_locations()
+    header = MAPPED_HEADER.pack(MAPPED_MAGIC, MAPPED_VERSION, board_model.get_grid_size(),
+                                len(locations), board_model.get_seed(), time_elapsed)
+
+    temp_file = file_name + ".tmp"
+    with open(temp_file, "wb") as save_file:
+        save_file.write(header.ljust(MAPPED_ALIGNMENT, b"\0"))
+        write_chunks(save_file, board_model.get_game().encode("ascii"), progress)
+        save_file.write(struct.pack(f"<{len(locations)}I", *locations))
+    os.replace(temp_file, file_name)
+
+def update_mapped_save(file_name, board_model, time_elapsed, progress=None):
+    """Saves a game back to the mapped save file it is played from. Its
+    cells are already in the file, so only the header is rewritten.
+
+    Parameters:
+        file_name (str): the file the game is mapped from.
+        board_model (BoardModel): the game, already flushed to the file.
+        time_elapsed (int): the time elapsed in seconds.
+        progress (callable): called with the bytes written and total, or None.
+    """
+    header = MAPPED_HEADER.pack(MAPPED_MAGIC, MAPPED_VERSION, board_model.get_grid_size(),
+                                len(board_model.get_pokemon_locations()), board_model.get_seed(), time_elapsed)
+    with open(file_name, "r+b") as save_file:
+        save_file.write(header)
+        save_file.flush()
+        os.fsync(save_file.fileno())
+    if progress is not None:
+        progress(len(header), len(header))
+
+def open_mapped_save(file_name, writable=True):
+    """Opens a mapped save file as a board model whose game string is the
+    file itself. Only the header and pokemon locations are read; cells are
+    paged in as they are used and changes are written back to the file.
+
+    Parameters:
+        file_name (str): the file to open.
+        writable (bool): False to map the file read only.
+
+    Returns:
+        (tuple): the board model (BoardModel) and the time elapsed in
+        seconds (int).
+    """
+    with open(file_name, "r+b" if writable else "rb") as save_file:
+        header = save_file.read(MAPPED_HEADER.size)
+        if len(header) < MAPPED_HEADER.size:
+            raise ValueError("Save file is truncated")
+        magic, version, grid_size, count, seed, time_elapsed = MAPPED_HEADER.unpack(header)
+        if magic != MAPPED_MAGIC:
+            raise ValueError("Not a mapped save file")
+        if version != MAPPED_VERSION:
+            raise ValueError(f"Unsupported save file version {version}")
+
+        cells = grid_size*grid_size
+        save_file.seek(MAPPED_ALIGNMENT + cells)
+        location_data = save_file.read(4*count)
+        if len(location_data) != 4*count:
+            raise ValueError("Save file is truncated")
+        storage = mmap.mmap(save_file.fileno(), cells, offset=MAPPED_ALIGNMENT,
+                            access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+    board_model = BoardModel(0, 0)
+    board_model.set_storage(storage, file_name)
+    board_model.set_seed(seed)
+    board_model.set_pokemon_locations(struct.unpack(f"<{count}I", location_data))
+    return board_model, time_elapsed
+
+def load_board(file_name, progress=None, writable=True):
+    """Loads a save file of any format as a board model. Mapped saves are
+    played in place rather than read into memory.
+
+    Parameters:
+        file_name (str): the file to load.
+        progress (callable): called with the bytes read and total, or None.
+        writable (bool): False to map a mapped save read only.
+
+    Returns:
+        (tuple): the board model (BoardModel) and the time elapsed in
+        seconds (int).
+    """
+    with open(file_name, "rb") as save_file:
+        magic = save_file.read(len(MAPPED_MAGIC))
+    if magic == MAPPED_MAGIC:
+        return open_mapped_save(file_name, writable)
+
+    game, pokemon_locations, time_elapsed, seed = read_save(file_name, progress)
+    return board_from_save(game, pokemon_locations, seed), time_elapsed
+
+_headless_tiles = None
+
+def render_board_image(board, sprites=None, cell_size=THUMBNAIL_SIZE):
+    """Draws a board (game string) to a PIL image with the ImageBoardView
+    tile set, without using Tk.
+
+    Parameters:
+        board (str): the game string.
+        sprites (dict<int, int>): pokemon index -> sprite number.
+        cell_size (int): the width of a cell in pixels.
+
+    Returns:
+        (Image): the drawn board.
+    """
+    global _headless_tiles
+    load_pil()
+    if _headless_tiles is None:
+        _headless_tiles = TileCache(background=False)
+    cell_images = _headless_tiles.get_render_table(cell_size, photo=False)
+    sprites = sprites or {}
+
+    grid_size = math.isqrt(len(board))
+    board_image = Image.new("RGBA", (grid_size*cell_size, grid_size*cell_size), "white")
+    for index, instance in enumerate(board):
+        tile = cell_images[ord(instance)][sprites.get(index, 0)]
+        row, col = divmod(index, grid_size)
+        board_image.paste(tile, (col*cell_size, row*cell_size), tile)
+    return board_image
+
+def simulate_game(grid_size, num_pokemon, seed, moves):
+    """Plays a game by clicking random tall grass cells.
+
+    Parameters:
+        grid_size (int): the size of the game.
+        num_pokemon (int): the number of hidden pokemon.
+        seed (int): the seed for the board and the clicks.
+        moves (int): the most cells to click.
+
+    Returns:
+        (BoardModel): the board after the game.
+    """
+    return simulate_game_clicks(grid_size, num_pokemon, seed, moves)[0]
+
+def simulate_game_clicks(grid_size, num_pokemon, seed, moves):
+    """Plays a game by clicking random tall grass cells, as simulate_game,
+    and counts the clicks made.
+
+    Parameters:
+        grid_size (int): the size of the game.
+        num_pokemon (int): the number of hidden pokemon.
+        seed (int): the seed for the board and the clicks.
+        moves (int): the most cells to click.
+
+    Returns:
+        (tuple): the board after the game (BoardModel) and the clicks (int).
+    """
+    rng = random.Random(seed)
+    board_model = BoardModel(grid_size, num_pokemon)
+    board_model.set_pokemon_locations(rng.sample(range(grid_size**2), num_pokemon))
+    board_model.set_seed(seed)
+
+    clicks = 0
+    for _ in range(moves):
+        game = board_model.get_game()
+        unexposed = [index for index, instance in enumerate(game) if instance == UNEXPOSED]
+        if not unexposed:
+            break
+        index = rng.choice(unexposed)
+        clicks += 1
+        board_model.apply_action(ACTION_REVEAL, index)
+        if index in board_model.get_pokemon_locations():
+            break
+    return board_model, clicks
+
+class GameColumnWriter(object):
+    """Collects summaries of many games, and optionally their boards, into
+    one typed array per field and writes them as a columnar file. Each
+    column can be read straight into NumPy, e.g.
+    numpy.fromfile(file, dtype, count, offset=offset) with the dtype, count
+    and offset from the JSON index at the start of the file.
+    """
+    def __init__(self, boards=False):
+        """Constructs an empty writer.
+
+        Parameters:
+            boards (bool): True to also store each game's cells.
+        """
+        self._columns = {name: array.array(typecode) for name, typecode in GAME_COLUMNS}
+        self._boards = bytearray() if boards else None
+        self._board_offsets = array.array("Q", [0])
+
+    def add(self, board_model, time_elapsed, clicks):
+        """Adds a game.
+
+        Parameters:
+            board_model (BoardModel): the game.
+            time_elapsed (int): the time elapsed in seconds.
+            clicks (int): the number of clicks made.
+        """
+        if board_model.check_loss():
+            outcome = OUTCOME_LOST
+        elif board_model.check_win():
+            outcome = OUTCOME_WON
+        else:
+            outcome = OUTCOME_PLAYING
+
+        flags = board_model.count_cells(FLAG)
+        covered = board_model.count_cells(UNEXPOSED) + flags + board_model.count_cells(POKEMON)
+        self.add_row((board_model.get_grid_size(), board_model.get_num_pokemon(), outcome,
+                      time_elapsed, clicks, board_model.get_grid_size()**2 - covered,
+                      flags, board_model.get_seed()))
+        if self._boards is not None:
+            self._boards += pack_cells(board_model.get_game())
+            self._board_offsets.append(len(self._boards))
+
+    def add_row(self, values):
+        """Adds the summary of a game.
+
+        Parameters:
+            values (tuple<int>): the value of each of GAME_COLUMNS.
+        """
+        for (name, _), value in zip(GAME_COLUMNS, values):
+            self._columns[name].append(value)
+
+    def write(self, file_name):
+        """Writes the columns to a file: COLUMNS_MAGIC, the length of the
+        JSON index as 8 bytes, the index and then the columns.
+
+        Parameters:
+            file_name (str): the file to write.
+        """
+        import json
+
+        columns = dict(self._columns)
+        if self._boards is not None:
+            columns["boards"] = array.array("B", self._boards)
+            columns["board_offsets"] = self._board_offsets
+
+        rows = len(columns[GAME_COLUMNS[0][0]])
+        index = {"rows": rows, "columns": {}}
+        offset = 0
+        for name, values in columns.items():
+            index["columns"][name] = {"dtype": f"<u{values.itemsize}", "count": len(values),
+                                      "offset": offset}
+            offset += -(-len(values)*values.itemsize//COLUMNS_ALIGNMENT)*COLUMNS_ALIGNMENT
+
+        #Offsets are from the start of the file, so add the padded header length to them
+        header_size = len(COLUMNS_MAGIC) + 8 + len(json.dumps(index)) + 16*len(columns)
+        header_size = -(-header_size//COLUMNS_ALIGNMENT)*COLUMNS_ALIGNMENT
+        for column in index["columns"].values():
+            column["offset"] += header_size
+        header = json.dumps(index).encode()
+        header = COLUMNS_MAGIC + struct.pack("<Q", header_size) + header.ljust(header_size - len(COLUMNS_MAGIC) - 8)
+
+        with open(file_name, "wb") as columns_file:
+            columns_file.write(header)
+            for values in columns.values():
+                if sys.byteorder != "little":
+                    values = array.array(values.typecode, values)
+                    values.byteswap()
+                data = values.tobytes()
+                columns_file.write(data.ljust(-(-len(data)//COLUMNS_ALIGNMENT)*COLUMNS_ALIGNMENT, b"\0"))
+
+def read_game_columns(file_name):
+    """Memory maps a columnar file written by GameColumnWriter. The columns
+    are paged in as they are used, so queries only touch the fields they need.
+
+    Parameters:
+        file_name (str): the file to read.
+
+    Returns:
+        (dict<str, memoryview>): each column as an array of integers.
+    """
+    import json
+
+    with open(file_name, "rb") as columns_file:
+        if columns_file.read(len(COLUMNS_MAGIC)) != COLUMNS_MAGIC:
+            raise ValueError("Not a columnar game file")
+        header_size, = struct.unpack("<Q", columns_file.read(8))
+        index = json.loads(columns_file.read(header_size - len(COLUMNS_MAGIC) - 8))
+        mapping = mmap.mmap(columns_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapping)
+    columns = {}
+    for name, column in index["columns"].items():
+        itemsize = int(column["dtype"][2:])
+        typecode = next(code for code in "BHILQ" if array.array(code).itemsize == itemsize)
+        data = view[column["offset"]:column["offset"] + column["count"]*itemsize]
+        if sys.byteorder == "little":
+            columns[name] = data.cast(typecode)
+        else:
+            values = array.array(typecode, data)
+            values.byteswap()
+            columns[name] = memoryview(values)
+    return columns
+
+def columns_main(args):
+    """Command line entry point for exporting game summaries to a columnar
+    file, e.g. python a3.py columns games.pkc --saves *.sav --simulate 10000
+
+    Parameters:
+        args (list<str>): the command line arguments after "columns".
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="a3.py columns",
+                                     description="Export game summaries to a columnar file.")
+    parser.add_argument("out_file")
+    parser.add_argument("--saves", nargs="*", default=[], help="save files to add")
+    parser.add_argument("--replays", nargs="*", default=[], help="replay files to add, played to the end")
+    parser.add_argument("--simulate", type=int, default=0, help="number of random games to add")
+    parser.add_argument("--grid-size", type=int, default=10)
+    parser.add_argument("--pokemon", type=int, default=15)
+    parser.add_argument("--moves", type=int, default=10, help="clicks per simulated game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first simulated game")
+    parser.add_argument("--boards", action="store_true", help="also store the cells of every game")
+    options = parser.parse_args(args)
+
+    writer = GameColumnWriter(options.boards)
+    for save in options.saves:
+        board_model, time_elapsed = load_board(save)
+        writer.add(board_model, time_elapsed, 0)
+        board_model.close()
+
+    for replay in options.replays:
+        engine = read_replay(replay)
+        engine.seek(engine.get_num_moves())
+        milliseconds = engine.get_time(engine.get_num_moves() - 1) if engine.get_num_moves() else 0
+        writer.add(engine.get_board_model(), milliseconds//1000, engine.get_num_moves())
+
+    for seed in range(options.seed, options.seed + options.simulate):
+        board_model, clicks = simulate_game_clicks(options.grid_size, options.pokemon, seed, options.moves)
+        writer.add(board_model, 0, clicks)
+    writer.write(options.out_file)
+
+def stats_main(args):
+    """Command line entry point for summarising a columnar file, e.g.
+    python a3.py stats games.pkc
+
+    Parameters:
+        args (list<str>): the command line arguments after "stats".
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="a3.py stats", description="Summarise a columnar game file.")
+    parser.add_argument("columns_file")
+    options = parser.parse_args(args)
+
+    columns = read_game_columns(options.columns_file)
+    rows = len(columns["outcome"])
+    print(f"games: {rows}")
+    if not rows:
+        return
+
+    outcomes = bytes(columns["outcome"])
+    for name, outcome in (("won", OUTCOME_WON), ("lost", OUTCOME_LOST), ("playing", OUTCOME_PLAYING)):
+        print(f"{name}: {outcomes.count(outcome)} ({outcomes.count(outcome)/rows:.1%})")
+    for name in ("time", "clicks", "revealed", "flags"):
+        print(f"mean {name}: {sum(columns[name])/rows:.2f}")
+    cells = sum(size*size for size in columns["grid_size"])
+    print(f"mean density: {sum(columns['num_pokemon'])/cells:.3f}")
+
+def render_job(job):
+    """Renders one board image for export_board_images. This runs in a
+    worker process.
+
+    Parameters:
+        job (tuple): ("save", save file, output file, cell size) or
+        ("simulate", (grid size, pokemon, seed, moves), output file, cell size).
+
+    Returns:
+        (str): the output file.
+    """
+    kind, source, out_file, cell_size = job
+    if kind == "save":
+        game_string, pokemon_locations, _, seed = read_save(source)
+        board_model = board_from_save(game_string, pokemon_locations, seed or 0)
+    else:
+        board_model = simulate_game(*source)
+
+    board_image = render_board_image(board_model.get_game(), board_model.get_sprites(), cell_size)
+    board_image.save(out_file)
+    return out_file
+
+def export_board_images(jobs, workers=None):
+    """Renders many board images across a pool of processes.
+
+    Parameters:
+        jobs (list<tuple>): the boards to render, as taken by render_job.
+        workers (int): the number of processes, or None for one per CPU.
+
+    Returns:
+        (list<str>): the output files in the order of the jobs.
+    """
+    #Imported here as multiprocessing is only needed for exports
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(len(jobs)//((workers or os.cpu_count() or 1)*4), 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_job, jobs, chunksize=chunksize))
+
+def export_main(args):
+    """Command line entry point for exporting board images, e.g.
+    python a3.py export thumbnails --saves save_file.txt --simulate 1000
+
+    Parameters:
+        args (list<str>): the command line arguments after "export".
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="a3.py export",
+                                     description="Render boards to PNG images without opening a window.")
+    parser.add_argument("out_dir", help="directory to write the images to")
+    parser.add_argument("--saves", nargs="*", default=[], help="save files to render")
+    parser.add_argument("--simulate", type=int, default=0, help="number of random games to render")
+    parser.add_argument("--grid-size", type=int, default=10)
+    parser.add_argument("--pokemon", type=int, default=15)
+    parser.add_argument("--moves", type=int, default=10, help="clicks per simulated game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first simulated game")
+    parser.add_argument("--cell-size", type=int, default=THUMBNAIL_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    options = parser.parse_args(args)
+
+    os.makedirs(options.out_dir, exist_ok=True)
+    jobs = []
+    for save in options.saves:
+        name = os.path.splitext(os.path.basename(save))[0] + ".png"
+        jobs.append(("save", save, os.path.join(options.out_dir, name), options.cell_size))
+
+    for seed in range(options.seed, options.seed + options.simulate):
+        game = (options.grid_size, options.pokemon, seed, options.moves)
+        name = f"game_{seed:06d}.png"
+        jobs.append(("simulate", game, os.path.join(options.out_dir, name), options.cell_size))
+
+    export_board_images(jobs, options.workers)
+
+def benchmark_main(args):
+    """Command line entry point for the startup benchmark, e.g.
+    python a3.py benchmark --runs 10 --record startup.jsonl
+
+    Measures the time to import a3 in a fresh interpreter (and checks that
+    no GUI or image modules beyond tkinter were loaded) and the time from
+    creating the root window to the first paint of the board.
+
+    Parameters:
+        args (list<str>): the command line arguments after "benchmark".
+    """
+    import argparse
+    import json
+    import statistics
+    import subprocess
+
+    parser = argparse.ArgumentParser(prog="a3.py benchmark",
+                                     description="Measure import time and time to first paint.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--record", help="file to append the results to, one JSON object per line")
+    options = parser.parse_args(args)
+
+    probe = ("import sys, time\n"
+             "start = time.perf_counter()\n"
+             "import a3\n"
+             "end = time.perf_counter()\n"
+             "print(end - start, 'PIL' in sys.modules, 'tkinter.filedialog' in sys.modules)\n")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    import_times = []
+    for _ in range(options.runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.split()
+        import_times.append(float(output[0]))
+    result = {
+        "import_ms": round(statistics.median(import_times)*1000, 2),
+        "imports_pil": output[1] == "True",
+        "imports_filedialog": output[2] == "True",
+        "first_paint_ms": None,
+        }
+
+    try:
+        start = time.perf_counter()
+        benchmark_root = tk.Tk()
+        PokemonGame(benchmark_root)
+        benchmark_root.update()
+        result["first_paint_ms"] = round((time.perf_counter() - start)*1000, 2)
+        benchmark_root.destroy()
+    except tk.TclError: #No display to paint on
+        pass
+
+    print(json.dumps(result))
+    if options.record:
+        with open(options.record, "a") as record:
+            record.write(json.dumps(result) + "\n")
+
+def replay_main(args):
+    """Command line entry point for watching a replay, e.g.
+    python a3.py replay replay.rpl --speed 2
+
+    Parameters:
+        args (list<str>): the command line arguments after "replay".
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="a3.py replay", description="Watch a saved replay.")
+    parser.add_argument("replay_file")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--move", type=int, default=0, help="click to start at")
+    options = parser.parse_args(args)
+
+    replay_root = tk.Tk()
+    replay_root.title("Pokemon: Got2 Find Them All! - Replay")
+    player = ReplayPlayer(replay_root, read_replay(options.replay_file), options.speed)
+    player.pack(fill=tk.BOTH, expand=1)
+    player.seek(options.move)
+    replay_root.mainloop()
+
+def library_main(args):
+    """Command line entry point for listing the save library, e.g.
+    python a3.py library --sort progress --grid-size 10
+
+    Parameters:
+        args (list<str>): the command line arguments after "library".
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="a3.py library", description="List the saves in the save library.")
+    parser.add_argument("--dir", default=LIBRARY_DIR, help="library directory")
+    parser.add_argument("--sort", default="modified", choices=LIBRARY_COLUMNS)
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--search", default="", help="only list saves whose name contains this")
+    parser.add_argument("--grid-size", type=int, default=None)
+    options = parser.parse_args(args)
+
+    library = SaveLibrary(options.dir)
+    for name, grid_size, num_pokemon, progress, time_elapsed, modified in library.list_saves(
+            options.sort, not options.ascending, options.search, options.grid_size):
+        modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(modified/1e9))
+        print(f"{name:30} {grid_size:>4} {num_pokemon:>6} {progress:>6.0%} {time_elapsed:>6}s  {modified}")
+    library.close()
 
 def main():
-    """Main holds the code to run at startup and when the
-    program is called to restart. This code creates the root
-    window for the tkinter package. Both root and pokemongame
+    """Main holds the code to run at startup. This code creates the
+    root window for the tkinter package. Both root and pokemongame
     are global to allow nested functions to access the
     required parameters.
     """
@@ -909,7 +4727,21 @@ def main():
     global pokemongame
     root = tk.Tk()
     pokemongame = PokemonGame(root)
+    pokemongame.start_autosave()
     root.mainloop()
     
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["export"]:
+        export_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["benchmark"]:
+        benchmark_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["replay"]:
+        replay_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["library"]:
+        library_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["columns"]:
+        columns_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["stats"]:
+        stats_main(sys.argv[2:])
+    else:
+        main()
@@ -4,15 +4,23 @@ Tests for CSSE1001 / 7030 Assignment 3
 
 __author__ = "Steven Summers"
 
+import contextlib
 import functools
 import inspect
+import io
+import itertools
+import os
+import random
 import tkinter as tk
 import _tkinter
 import sys
+import tempfile
+import threading
+import tracemalloc
 
 from pathlib import Path
 
-from testrunner import AttributeGuesser, OrderedTestCase, TestMaster, skipIfFailed
+from testrunner import AttributeGuesser, OrderedTestCase, TestMaster, skipIfFailed, timeout
 
 IMPORTED_MODULES = set(sys.modules)
 
@@ -60,7 +68,7 @@ class TestDesign(TestA3):
             self.aggregate(self.assertFunctionDefined, a3.PokemonGame, '__init__', 5)
 
         if self.aggregate(self.assertDefined, a3, 'TASK_TWO'):
-            if self.aggregate(self.assertClassDefined, a3, 'StatusBar'):
+            if self.aggregate(self.assertClassDefined, a3, 'StatusBar', tag='StatusBar'):
                 self.aggregate(self.assertIsSubclass, a3.StatusBar, tk.Frame)
 
             if self.aggregate(self.assertClassDefined, a3, 'ImageBoardView'):
@@ -153,12 +161,611 @@ class TestTkinterApp(OrderedTestCase):
         if missing:
             self.fail(f'The following events have not been bound {missing}')
 
+    @skipIfFailed(TestDesign, TestDesign.test_classes_and_functions_defined.__name__, tag='StatusBar')
+    def test_status_bar_reuses_widgets(self):
+        """ test status bar updates do not create widgets or leak memory """
+        root = tk.Tk()
+        status_bar = self.a3.StatusBar(root, 15, '~' * 100)
+        children = len(status_bar.winfo_children())
+
+        tracemalloc.start()
+        for i in range(1000):
+            status_bar.set_time(i)
+            status_bar.update_num_catches('F' * (i % 15) + '~' * 85)
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(1000):
+            status_bar.set_time(i)
+            status_bar.update_num_catches('F' * (i % 15) + '~' * 85)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.assertEqual(len(status_bar.winfo_children()), children,
+                         msg='StatusBar should reuse its widgets when updating')
+        self.assertLess(after - before, 64 * 1024,
+                        msg='StatusBar memory use should not grow with updates')
+
+        status_bar.set_time(90)
+        self.assertEqual(status_bar.get_time(), 90)
+        root.destroy()
+
+    @skipIfFailed(TestDesign, TestDesign.test_classes_and_functions_defined.__name__, tag='PokemonGame')
+    def test_new_game_in_place(self):
+        """ test new games reuse the window and do not leak memory """
+        root = tk.Tk()
+        app = self.a3.PokemonGame(root)
+        self.a3.root, self.a3.pokemongame = root, app
+        board_view = app.board_view
+        children = len(root.winfo_children())
+        for thread in threading.enumerate():  # wait for background image loading
+            if thread is not threading.main_thread():
+                thread.join()
+
+        tracemalloc.start()
+        for _ in range(500):
+            app.new_game()
+        self._pump_tk_events(root)
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(500):
+            app.new_game()
+        self._pump_tk_events(root)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.assertIs(app.board_view, board_view, msg='A new game should keep the board view')
+        self.assertEqual(len(root.winfo_children()), children,
+                         msg='A new game should not create new widgets')
+        self.assertLess(after - before, 256 * 1024,
+                        msg='Memory use should not grow with new games')
+        root.destroy()
+
+
+class TestMoveJournal(TestA3):
+    def test_checkpoint_and_recover(self):
+        """ test the game is recovered from a checkpoint and the records written after it """
+        a3 = self.a3
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(a3.MoveJournal(directory).recover())
+            board_model = a3.board_from_save('~' * 25, (0, 4, 24), 1)
+            journal = a3.MoveJournal(directory)
+            journal.checkpoint(board_model, 3)
+            board_model.toggle_flag(0)
+            journal.record(a3.ACTION_FLAG, 0, 4)
+            journal.record_cells(board_model.apply_action(a3.ACTION_REVEAL, 12), 5)
+
+            #Records made while a checkpoint is written go to the journal after it
+            copy = board_model.snapshot()
+            generation = journal.start_checkpoint()
+            board_model.toggle_flag(24)
+            journal.record(a3.ACTION_FLAG, 24, 6)
+            journal.finish_checkpoint(journal.write_checkpoint(copy, 5, generation))
+            journal.sync()
+            open(journal.get_temp_file(generation + 1), 'wb').close()
+            with open(directory + '/journal.bin', 'ab') as journal_file:
+                journal_file.write(b'\x02\x00')  # a torn record
+
+            recovered, time_elapsed = a3.MoveJournal(directory).recover()
+            self.assertEqual((recovered.get_game(), time_elapsed), (board_model.get_game(), 6))
+            self.assertEqual(recovered.get_pokemon_locations(), (0, 4, 24))
+            self.assertEqual(sorted(os.listdir(directory)), ['checkpoint' + a3.SAVE_EXTENSION, 'journal.bin'])
+            journal.close()
+
+    def test_finished_games_are_not_recovered(self):
+        """ test a journal that ends in a loss or a win recovers nothing """
+        a3 = self.a3
+        for moves in (((a3.ACTION_REVEAL, 0),),
+                      ((a3.ACTION_FLAG, 0), (a3.ACTION_REVEAL, 1), (a3.ACTION_REVEAL, 2), (a3.ACTION_REVEAL, 3))):
+            with tempfile.TemporaryDirectory() as directory:
+                journal = a3.MoveJournal(directory)
+                journal.checkpoint(a3.board_from_save('~~~~', (0,), 1), 10)
+                for action, index in moves[:-1]:
+                    journal.record(action, index, 11)
+                journal.sync()
+                self.assertIsNotNone(a3.MoveJournal(directory).recover())
+
+                journal.record(*moves[-1], 12)
+                journal.close()
+                self.assertIsNone(a3.MoveJournal(directory).recover(), msg=f'moves {moves}')
+
+    def test_failed_checkpoints_are_abandoned(self):
+        """ test journalling carries on after a checkpoint fails to be written """
+        a3 = self.a3
+        with tempfile.TemporaryDirectory() as directory:
+            journal = a3.MoveJournal(directory, interval=2)
+            journal.checkpoint(a3.board_from_save('~' * 9, (0, 8), 1), 0)
+            journal.record(a3.ACTION_FLAG, 0, 1)
+            journal.record(a3.ACTION_FLAG, 8, 2)
+            self.assertTrue(journal.checkpoint_due())
+
+            generation = journal.start_checkpoint()
+            journal.record(a3.ACTION_FLAG, 8, 3)
+            journal.abandon_checkpoint(generation)
+            self.assertFalse(journal.is_checkpoint_pending())
+            self.assertFalse(journal.checkpoint_due())
+            journal.record(a3.ACTION_REVEAL, 4, 4)
+            journal.record(a3.ACTION_FLAG, 8, 5)
+            self.assertTrue(journal.checkpoint_due())
+            journal.sync()
+            board_model, time_elapsed = a3.MoveJournal(directory).recover()
+            self.assertEqual((board_model.get_game(), time_elapsed), ('F~~~2~~~F', 5))
+
+            generation = journal.start_checkpoint(True)
+            journal.abandon_checkpoint(generation)
+            self.assertTrue(journal.checkpoint_due())
+            self.assertIsNone(a3.MoveJournal(directory).recover())
+            journal.close()
+
+
+class TestMappedSaves(TestA3):
+    def test_changes_are_written_back(self):
+        """ test a mapped save is played in place and changes reach the file """
+        a3 = self.a3
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = directory + '/game' + a3.MAPPED_EXTENSION
+            a3.write_mapped_save(file_name, a3.board_from_save('~' * 16, (0, 15), 99), 7)
+            board_model, time_elapsed = a3.open_mapped_save(file_name)
+            self.assertEqual((board_model.get_game(), time_elapsed), ('~' * 16, 7))
+            self.assertEqual((board_model.get_pokemon_locations(), board_model.get_seed()), ((0, 15), 99))
+            self.assertEqual(board_model.get_storage_file(), file_name)
+
+            board_model.toggle_flag(0)
+            board_model.apply_action(a3.ACTION_REVEAL, 5)
+            game = board_model.get_game()
+            self.assertEqual(board_model.count_cells('F'), 1)
+            self.assertEqual(board_model.get_cells().count('~'), game.count('~'))
+            a3.update_mapped_save(file_name, board_model, 8)
+            board_model.close()
+
+            board_model, time_elapsed = a3.open_mapped_save(file_name, writable=False)
+            self.assertEqual((board_model.get_game(), time_elapsed), (game, 8))
+            with self.assertRaises(TypeError):
+                board_model.toggle_flag(15)
+            board_model.close()
+
+    def test_snapshot_is_a_copy(self):
+        """ test a snapshot of a mapped game is unaffected by later changes, and the other way round """
+        a3 = self.a3
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = directory + '/game' + a3.MAPPED_EXTENSION
+            a3.write_mapped_save(file_name, a3.board_from_save('~' * 9, (4,), 1), 0)
+            board_model, _ = a3.load_board(file_name)
+            snapshot = board_model.snapshot()
+            self.assertIsNone(snapshot.get_storage_file())
+            board_model.toggle_flag(4)
+            snapshot.apply_action(a3.ACTION_REVEAL, 0)
+            self.assertEqual(board_model.get_game(), '~~~~F~~~~')
+            self.assertEqual(snapshot.get_game(), '1~~~~~~~~')
+            self.assertEqual((board_model.count_cells('F'), snapshot.count_cells('F')), (1, 0))
+
+            #Saving a copy over the file leaves the mapped game with its own cells
+            a3.write_mapped_save(file_name, snapshot, 3)
+            board_model.close()
+            board_model, time_elapsed = a3.load_board(file_name, writable=False)
+            self.assertEqual((board_model.get_game(), time_elapsed), ('1~~~~~~~~', 3))
+            board_model.close()
+
+
+class TestReplays(TestA3):
+    def test_flag_during_cascade(self):
+        """ test a flag placed while a cascade spreads is replayed as it was played """
+        a3 = self.a3
+        board_model = a3.board_from_save('~' * 400, (399,), 1)
+        recorder = a3.ReplayRecorder(board_model)
+        recorder.prepare()
+        batches = board_model.reveal_cells(0)
+        recorder.record_cells(next(batches))
+        self.assertEqual(board_model.get_cell(300), '~')
+        board_model.toggle_flag(300)
+        recorder.record(a3.ACTION_FLAG, 300)
+        for batch in batches:
+            recorder.record_cells(batch)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = directory + '/game' + a3.REPLAY_EXTENSION
+            recorder.save(file_name)
+            engine = a3.read_replay(file_name)
+        self.assertEqual(engine.get_board_model().get_game(), '~' * 400)
+        engine.seek(engine.get_num_moves())
+        self.assertEqual(engine.get_board_model().get_game(), board_model.get_game())
+        self.assertEqual(board_model.get_cell(300), 'F')
+
+    def test_seek_matches_linear_replay(self):
+        """ test seeking to any move gives the game stepped to linearly """
+        a3 = self.a3
+        rng = random.Random(1006)
+        locations = tuple(sorted(rng.sample(range(144), 20)))
+        board_model = a3.board_from_save('~' * 144, locations, 1)
+        actions = []
+        for milliseconds in range(60):
+            index = rng.randrange(144)
+            if board_model.get_cell(index) != '~':
+                continue
+            if index in locations:
+                board_model.toggle_flag(index)
+                actions.append((a3.ACTION_FLAG, index, milliseconds))
+            else:
+                actions += [(a3.ACTION_EXPOSE, cell, milliseconds)
+                            for cell in board_model.apply_action(a3.ACTION_REVEAL, index)]
+
+        start = a3.board_from_save('~' * 144, locations, 1)
+        engine = a3.ReplayEngine(start, actions, interval=4)
+        games = [start.get_game()]
+        for _ in range(engine.get_num_moves()):
+            engine.step()
+            games.append(start.get_game())
+        self.assertEqual(games[-1], board_model.get_game())
+        self.assertEqual(len(set(games)), len(games), msg='each move should change the game')
+
+        for move in rng.sample(range(len(games)), len(games)) + [0, len(games) - 1, len(games) + 5, -3]:
+            engine.seek(move)
+            expected = games[max(0, min(move, len(games) - 1))]
+            self.assertEqual(start.get_game(), expected, msg=f'seek to {move}')
+            self.assertEqual(engine.get_move(), max(0, min(move, len(games) - 1)))
+
+
+class TestSaveLibrary(TestA3):
+    def test_save_sync_and_list(self):
+        """ test saves are indexed, kept in sync with the directory, sorted and filtered """
+        a3 = self.a3
+        with tempfile.TemporaryDirectory() as directory:
+            library = a3.SaveLibrary(directory)
+            self.assertEqual(library.list_saves(), [])
+            library.save('small' + a3.SAVE_EXTENSION, a3.board_from_save('~' * 16, (3,), 1), 30)
+            library.save('big_one' + a3.MAPPED_EXTENSION, a3.board_from_save('~' * 100, (3, 50), 1), 10)
+            with open(directory + '/broken' + a3.SAVE_EXTENSION, 'wb') as broken:
+                broken.write(b'not a save')
+            self.assertEqual(library.sync(), 0)
+
+            rows = library.list_saves(order_by='time', descending=False)
+            self.assertEqual([row[:3] + row[4:5] for row in rows],
+                             [('big_one' + a3.MAPPED_EXTENSION, 10, 2, 10), ('small' + a3.SAVE_EXTENSION, 4, 1, 30)])
+            self.assertEqual([row[0] for row in library.list_saves(grid_size=4)], ['small' + a3.SAVE_EXTENSION])
+            self.assertEqual([row[0] for row in library.list_saves(search='_')], ['big_one' + a3.MAPPED_EXTENSION])
+            self.assertEqual(library.list_saves(search='%'), [])
+            with self.assertRaises(ValueError):
+                library.list_saves(order_by='name; DROP TABLE saves')
+
+            #Files changed or removed behind the library's back
+            a3.write_save(directory + '/small' + a3.SAVE_EXTENSION, a3.board_from_save('~' * 9, (3,), 1), 5)
+            os.remove(directory + '/big_one' + a3.MAPPED_EXTENSION)
+            self.assertEqual(library.sync(), 1)
+            self.assertEqual([row[:3] + row[4:5] for row in library.list_saves()],
+                             [('small' + a3.SAVE_EXTENSION, 3, 1, 5)])
+            self.assertEqual(library.sync(), 0)
+            library.close()
+
+
+class TestSaveCodecs(TestA3):
+    @staticmethod
+    def _random_game(rng, grid_size, num_pokemon, uncovered):
+        """ random game string and pokemon locations with some cells uncovered """
+        cells = grid_size ** 2
+        locations = tuple(sorted(rng.sample(range(cells), num_pokemon)))
+        game = [rng.choice('012345678') if rng.random() < uncovered else '~' for _ in range(cells)]
+        for index in rng.sample(locations, num_pokemon // 3):
+            game[index] = 'F'
+        return ''.join(game), locations
+
+    def test_snapshot_round_trip(self):
+        """ test snapshots decode to the game they encoded in every format """
+        rng = random.Random(1001)
+        a3 = self.a3
+        for grid_size, num_pokemon, uncovered in ((1, 0, 0), (3, 9, 0), (7, 5, 0.5), (20, 40, 0.9), (30, 400, 0.3)):
+            game, locations = self._random_game(rng, grid_size, num_pokemon, uncovered)
+            cells = len(game)
+            snapshot = a3.encode_snapshot(game, locations)
+            self.assertEqual(a3.decode_snapshot(*snapshot, num_pokemon, cells), (game, locations))
+
+            location_format, location_data = a3.encode_locations(locations, cells)
+            for cell_format, cell_data in ((a3.CELLS_PACKED, a3.pack_cells(game)),
+                                           (a3.CELLS_RLE, a3.encode_runs(game))):
+                for compression in (a3.COMPRESS_NONE, a3.COMPRESS_ZLIB, a3.COMPRESS_LZMA):
+                    data = a3.compress(cell_data + location_data, compression)
+                    decoded = a3.decode_snapshot(location_format, cell_format, compression, len(cell_data),
+                                                 data, num_pokemon, cells)
+                    self.assertEqual(decoded, (game, locations),
+                                     msg=f'cell format {cell_format}, compression {compression}')
+
+    def test_location_formats(self):
+        """ test sparse and dense pokemon locations both round trip """
+        a3 = self.a3
+        cells = 64 * 64
+        for locations in ((), (0,), (5, 130, 4095), tuple(range(0, cells, 2)), tuple(range(cells))):
+            location_format, data = a3.encode_locations(locations, cells)
+            self.assertEqual(a3.decode_locations(location_format, data, len(locations), cells), locations)
+        self.assertEqual(a3.encode_locations(tuple(range(cells)), cells)[0], a3.LOCATIONS_BITMAP)
+        self.assertEqual(a3.encode_locations((5, 130), cells)[0], a3.LOCATIONS_DELTAS)
+
+    def test_save_round_trip(self):
+        """ test whole saves round trip and corrupted saves are rejected """
+        a3 = self.a3
+        rng = random.Random(1002)
+        game, locations = self._random_game(rng, 12, 20, 0.4)
+        board_model = a3.board_from_save(game, locations, 1234)
+        data = a3.encode_save(board_model, 77)
+        self.assertEqual(a3.decode_save(data), (game, locations, 77, 1234))
+
+        corrupted = bytearray(data)
+        corrupted[len(corrupted) // 2] ^= 0xFF
+        for bad in (data[:-1], bytes(corrupted), b'', b'PKSV'):
+            with self.assertRaises(ValueError):
+                a3.decode_save(bad)
+
+
+class TestGameColumns(TestA3):
+    def test_write_read_and_stats(self):
+        """ test game summaries round trip through a columnar file and are summarised """
+        a3 = self.a3
+        won = a3.board_from_save('F111', (0,), 5)
+        lost = a3.board_from_save('P~~~', (0,), 6)
+        playing = a3.board_from_save('~' * 9, (4,), 7)
+        playing.toggle_flag(0)
+        writer = a3.GameColumnWriter(boards=True)
+        for board_model, time_elapsed, clicks in ((won, 12, 3), (lost, 4, 1), (playing, 0, 1)):
+            writer.add(board_model, time_elapsed, clicks)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = directory + '/games.pkc'
+            writer.write(file_name)
+            columns = a3.read_game_columns(file_name)
+            self.assertEqual(list(columns['grid_size']), [2, 2, 3])
+            self.assertEqual(list(columns['outcome']), [a3.OUTCOME_WON, a3.OUTCOME_LOST, a3.OUTCOME_PLAYING])
+            self.assertEqual(list(columns['time']), [12, 4, 0])
+            self.assertEqual(list(columns['clicks']), [3, 1, 1])
+            self.assertEqual(list(columns['revealed']), [3, 0, 0])
+            self.assertEqual(list(columns['flags']), [1, 0, 1])
+            self.assertEqual(list(columns['seed']), [5, 6, 7])
+            offsets = list(columns['board_offsets'])
+            boards = bytes(columns['boards'])
+            self.assertEqual([a3.unpack_cells(boards[start:end], cells) for start, end, cells
+                              in zip(offsets, offsets[1:], (4, 4, 9))], ['F111', 'P~~~', 'F~~~~~~~~'])
+            del columns, boards
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                a3.stats_main([file_name])
+        self.assertIn('games: 3', output.getvalue())
+        self.assertIn('won: 1 (33.3%)', output.getvalue())
+        self.assertIn('mean clicks: 1.67', output.getvalue())
+
+
+class TestLegacySaves(TestA3):
+    def test_valid_saves(self):
+        """ test well formed legacy saves are read """
+        parse_save = self.a3.parse_save
+        self.assertEqual(parse_save(str(['0F~~', str((1, 2)), str(12)])), ('0F~~', (1, 2), 12))
+        self.assertEqual(parse_save(str(['~' * 9, str((4,)), str(0)]) + '\n'), ('~' * 9, (4,), 0))
+        self.assertEqual(parse_save(str(['~' * 9, str(()), str(3)])), ('~' * 9, (), 3))
+        self.assertEqual(parse_save(str(['~~P~', str((2, 3)), str(5)])), ('~~P~', (2, 3), 5))
+        self.assertEqual(parse_save(str(['8~~~', str(()), str(2**32 - 1)])), ('8~~~', (), 2**32 - 1))
+
+    def test_malformed_saves(self):
+        """ test malformed or inconsistent legacy saves raise ValueError """
+        malformed = [
+            '',
+            'not a save',
+            str(['0F~~', str((1, 2))]),                   # missing the time
+            str(['0F~~', str((1, 2)), str(12)]) + 'x',    # trailing garbage
+            str(['0X~~', str((1, 2)), str(12)]),          # unknown cell
+            str(['09~~', str((1, 2)), str(12)]),          # no cell has nine neighbours
+            str(['0F~~', '(1, two)', str(12)]),           # location not a number
+            str(['0F~~', str((1, 2)), '-1']),             # negative time
+            str(['0F~~', str((1, 2)), str(2**32)]),       # time too large for a save
+            str(['0F~~', str((1, 2)), '9' * 10]),
+            str(['0F~', str((1,)), str(0)]),              # not a square grid
+            str(['~~~~', str((1, 1)), str(0)]),           # duplicate location
+            str(['~~~~', str((1, 4)), str(0)]),           # location outside the grid
+            str(['FF~~', str((3,)), str(0)]),             # more flags than pokemon
+            str(['P~~~', str((3,)), str(0)]),             # pokemon shown where there is none
+        ]
+        for data in malformed:
+            with self.assertRaises(ValueError, msg=repr(data)):
+                self.a3.parse_save(data)
+
+
+class TestConstraintSolver(TestA3):
+    def test_single_and_subset_deductions(self):
+        """ test safe cells are deduced from single numbers and from pairs of numbers """
+        a3 = self.a3
+        # 5 is safe next to the 0 at 2; 8 is safe because the 1 at 3 has its
+        # pokemon in {6, 7}, which the 1 at 4 also covers
+        board_model = a3.board_from_save('00011~~~~', (6,), 1)
+        solver = a3.ConstraintSolver(board_model)
+        self.assertEqual(solver.get_safe(), {5, 8})
+        self.assertEqual(solver.get_pokemon(), set())
+
+        board_model = a3.board_from_save('1~~~', (1,), 1)
+        self.assertEqual(a3.ConstraintSolver(board_model).get_pokemon(), set())
+        board_model = a3.board_from_save('3~~~', (1, 2, 3), 1)
+        self.assertEqual(a3.ConstraintSolver(board_model).get_pokemon(), {1, 2, 3})
+
+    def test_flagged_cells_are_not_hinted(self):
+        """ test a flagged cell deduced safe is never hinted or clicked by the bot """
+        a3 = self.a3
+        board_model = a3.board_from_save('0F~~~~~~~', (8,), 1)
+        solver = a3.ConstraintSolver(board_model)
+        self.assertIn(1, solver.get_safe())
+        self.assertEqual(solver.hint(), 3)
+
+        clicks = solver.play(limit=5)
+        self.assertLess(clicks, 5, msg='play should stop once only flagged cells are left')
+        self.assertIsNone(solver.hint())
+        self.assertEqual(board_model.get_game(), '0F001101~')
+
+    def test_deductions_are_sound(self):
+        """ test the bot never reveals a pokemon or deduces a wrong one """
+        a3 = self.a3
+        rng = random.Random(1003)
+        for _ in range(30):
+            grid_size = rng.randint(5, 12)
+            cells = grid_size ** 2
+            locations = tuple(sorted(rng.sample(range(cells), rng.randint(1, cells // 5))))
+            board_model = a3.board_from_save('~' * cells, locations, 1)
+            for index in rng.sample(range(cells), 8):
+                if board_model.get_cell(index) == '~' and index not in locations:
+                    if rng.random() < 0.3:
+                        board_model.toggle_flag(index)
+                    else:
+                        board_model.apply_action(a3.ACTION_REVEAL, index)
+
+            solver = a3.ConstraintSolver(board_model)
+            solver.play()
+            self.assertFalse(board_model.check_loss())
+            self.assertLessEqual(solver.get_pokemon(), set(locations))
+            self.assertFalse(solver.get_safe() & set(locations))
+
+
+class TestProbabilityEngine(TestA3):
+    @staticmethod
+    def _brute_force(a3, board_model):
+        """ chance of a pokemon in each covered cell over every consistent layout """
+        game = board_model.get_game()
+        covered = [index for index, cell in enumerate(game) if cell in '~F']
+        numbers = [(index, int(cell)) for index, cell in enumerate(game) if cell in a3.NUMBERS]
+        neighbours = {index: set(board_model.neighbour_directions(index)) for index, _ in numbers}
+        counts = dict.fromkeys(covered, 0)
+        layouts = 0
+        for layout in itertools.combinations(covered, board_model.get_num_pokemon()):
+            layout = set(layout)
+            if all(len(neighbours[index] & layout) == number for index, number in numbers):
+                layouts += 1
+                for index in layout:
+                    counts[index] += 1
+        return {index: count / layouts for index, count in counts.items()}
+
+    def _random_board(self, rng):
+        """ small random board with a few reveals and flags """
+        a3 = self.a3
+        grid_size = rng.choice((3, 4, 5))
+        cells = grid_size ** 2
+        locations = tuple(sorted(rng.sample(range(cells), rng.randint(1, 4))))
+        board_model = a3.board_from_save('~' * cells, locations, 1)
+        for index in rng.sample(range(cells), cells // 3):
+            if board_model.get_cell(index) == '~':
+                if index in locations or rng.random() < 0.2:
+                    board_model.toggle_flag(index)
+                else:
+                    board_model.apply_action(a3.ACTION_REVEAL, index)
+        return board_model
+
+    def _assert_matches(self, board_model, engine, places=9):
+        """ compare the engine's chances with brute force """
+        expected = self._brute_force(self.a3, board_model)
+        chances, interior_chance = engine.probabilities()
+        for index, chance in expected.items():
+            self.assertAlmostEqual(chances.get(index, interior_chance), chance, places=places,
+                                   msg=f'cell {index} of {board_model.get_game()}')
+
+    def test_matches_brute_force(self):
+        """ test the engine's chances equal enumeration of every layout """
+        a3 = self.a3
+        rng = random.Random(1004)
+        for _ in range(60):
+            board_model = self._random_board(rng)
+            if board_model.check_win():
+                continue
+            solver = a3.ConstraintSolver(board_model)
+            engine = a3.ProbabilityEngine(solver)
+            self._assert_matches(board_model, engine)
+
+            # after a click, without asking the solver first
+            safe = [index for index in range(len(board_model.get_game()))
+                    if board_model.get_cell(index) == '~' and index not in board_model.get_pokemon_locations()]
+            if safe:
+                changed = board_model.apply_action(a3.ACTION_REVEAL, rng.choice(safe))
+                solver.update(changed)
+                engine.update(changed)
+                self._assert_matches(board_model, engine)
+
+    def test_best_guess_skips_flags(self):
+        """ test the best guess is never a flagged cell """
+        a3 = self.a3
+        # the flag at 1 is certainly safe but cannot be clicked
+        board_model = a3.board_from_save('0F~~~~~~~', (8,), 1)
+        engine = a3.ProbabilityEngine(a3.ConstraintSolver(board_model))
+        self.assertEqual(engine.probabilities()[0][1], 0.0)
+        self.assertEqual(board_model.get_cell(engine.best_guess()), '~')
+
+        board_model = a3.board_from_save('FFF~', (0, 1, 2), 1)
+        engine = a3.ProbabilityEngine(a3.ConstraintSolver(board_model))
+        self.assertEqual(engine.best_guess(), 3)
+
+    def test_guess_finder_follows_changes(self):
+        """ test the guess finder's copy of the game gives a fresh engine's guess after each change """
+        a3 = self.a3
+        rng = random.Random(1007)
+        for _ in range(20):
+            board_model = self._random_board(rng)
+            finder = a3.GuessFinder(board_model.snapshot(), None)
+            changes = []
+            for _ in range(3):
+                if board_model.check_win():
+                    break
+                expected = a3.ProbabilityEngine(a3.ConstraintSolver(board_model)).best_guess()
+                self.assertEqual(finder.find(changes), expected, msg=board_model.get_game())
+                covered = [index for index in range(len(board_model.get_game())) if board_model.get_cell(index) == '~'
+                           and index not in board_model.get_pokemon_locations()]
+                if not covered:
+                    break
+                changed = board_model.apply_action(a3.ACTION_REVEAL, rng.choice(covered))
+                changes = [(index, board_model.get_cell(index)) for index in changed]
+
+
+class TestMonteCarloEstimator(TestA3):
+    @timeout(5)
+    def test_close_to_exact(self):
+        """ test sampled chances are close to the exact engine's """
+        a3 = self.a3
+        rng = random.Random(1005)
+        for _ in range(15):
+            locations = tuple(sorted(rng.sample(range(64), 10)))
+            board_model = a3.board_from_save('~' * 64, locations, 1)
+            for index in rng.sample(range(64), 12):
+                if board_model.get_cell(index) == '~' and index not in locations:
+                    board_model.apply_action(a3.ACTION_REVEAL, index)
+            if board_model.check_win():
+                continue
+
+            solver = a3.ConstraintSolver(board_model)
+            exact, exact_interior = a3.ProbabilityEngine(solver).probabilities()
+            estimator = a3.MonteCarloEstimator(batches=8, samples=300, workers=0, seed=1)
+            intervals, interior = a3.ProbabilityEngine(solver, estimator, exact_groups=0).intervals()
+            self.assertEqual(intervals.keys(), exact.keys())
+            for index, chance in exact.items():
+                self.assertAlmostEqual(intervals[index][0], chance, delta=0.08,
+                                       msg=f'cell {index} of {board_model.get_game()}')
+            if exact_interior is not None:
+                self.assertAlmostEqual(interior[0], exact_interior, delta=0.08)
+
+    def test_seeded_and_exact_intervals(self):
+        """ test batches are reproducible from the seed and exact chances have no interval """
+        a3 = self.a3
+        groups, need = [(2, (0,)), (3, (0, 1)), (2, (1,))], [2, 2]
+        first = a3.MonteCarloEstimator(batches=4, samples=200, workers=0, seed=7).estimate(groups, need)
+        second = a3.MonteCarloEstimator(batches=4, samples=200, workers=0, seed=7).estimate(groups, need)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 4)
+        self.assertNotEqual(first[0], first[1], msg='each batch should have its own stream')
+
+        board_model = a3.board_from_save('1~~~', (1,), 1)
+        intervals, interior = a3.ProbabilityEngine(a3.ConstraintSolver(board_model)).intervals()
+        self.assertEqual({width for _, width in intervals.values()}, {0.0})
+
 
 def main():
     test_cases = [
         TestDesign,
         TestTkinter,
-        TestTkinterApp
+        TestTkinterApp,
+        TestMoveJournal,
+        TestMappedSaves,
+        TestReplays,
+        TestSaveLibrary,
+        TestSaveCodecs,
+        TestGameColumns,
+        TestLegacySaves,
+        TestConstraintSolver,
+        TestProbabilityEngine,
+        TestMonteCarloEstimator
     ]
 
     master = TestMaster(max_diff=None,